@@ -7,6 +7,3 @@ MOVIE_IDS = [132608, 71685, 254984, 421386, 76816, 67612, 1251875, 197158, 22839
 # Split into batches of 25 for processing (smaller batches for detailed movies)
 BATCH_SIZE = 25
 MOVIE_BATCHES = [MOVIE_IDS[i:i+BATCH_SIZE] for i in range(0, len(MOVIE_IDS), BATCH_SIZE)]
-
-print(f"Total Brazilian movies: {len(MOVIE_IDS)}")
-print(f"Total batches: {len(MOVIE_BATCHES)}")
@@ -0,0 +1,331 @@
+"""Command line entry point for the movie data tools.
+
+Usage:
+    python cli.py collect popular [--target 500] [--max-requests N]
+    python cli.py collect brazilian [--target 100] [--max-requests N]
+    python cli.py ingest [--source brazilian] [--fetch-workers 4] [--batch-size 10] [--refresh]
+    python cli.py enrich [--workers 8] [--batch-size 100]
+    python cli.py export ids [--source brazilian]
+    python cli.py export snapshot [--output snapshot] [--format parquet]
+    python cli.py registry {stats,sync}
+    python cli.py graph path MOVIE_ID MOVIE_ID [--snapshot snapshot]
+    python cli.py graph stats [--snapshot snapshot]
+    python cli.py graph score [--snapshot snapshot] [--write]
+    python cli.py similarity build [--snapshot snapshot] [--k 10] [--full] [--write]
+    python cli.py similarity show MOVIE_ID
+    python cli.py schedule [--days 30] [--start YYYY-MM-DD] [--brazilian-share 0.2] [--dry-run]
+    python cli.py publish [--days 1] [--start YYYY-MM-DD] [--output ../app/public/daily]
+    python cli.py bench
+    python cli.py status
+
+Heavy dependencies (requests, psycopg2, pyarrow, numpy) are imported inside the subcommand
+that needs them, so `--help` and `status` start without loading them.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from config import BASE_DIR, data_path, setup
+
+# JSON file and scrapper module written by each collector
+COLLECTOR_FILES = {
+    'popular': (data_path('movie_ids_500.json'), data_path('movie_ids_for_scrapper.py')),
+    'brazilian': (data_path('brazilian_movies_100.json'), data_path('brazilian_movies_for_scrapper.py')),
+}
+
+# Modules timed by `bench`, cheapest first
+BENCH_MODULES = ['config', 'cli', 'pipeline', 'registry', 'pagination', 'db', 'tmdb', 'enrichment', 'snapshot', 'movie_graph', 'similarity', 'scheduler', 'publisher', 'get_popular_movies', 'get_brazilian_movies', 'tddb_api_scrapper']
+
+def cmd_collect(args):
+    """Collect movie IDs from TMDB"""
+    if args.collector == 'popular':
+        import get_popular_movies
+        get_popular_movies.main(target_count=args.target or 500, max_requests=args.max_requests)
+    else:
+        import get_brazilian_movies
+        get_brazilian_movies.main(target_count=args.target or 100, max_requests=args.max_requests)
+    return 0
+
+def cmd_ingest(args):
+    """Fetch movies from TMDB and write them to the database"""
+    import tddb_api_scrapper
+    tddb_api_scrapper.main(
+        source=args.source,
+        fetch_workers=args.fetch_workers,
+        batch_size=args.batch_size,
+        refresh=args.refresh,
+    )
+    return 0
+
+def cmd_enrich(args):
+    """Fill missing person and company details from TMDB"""
+    from enrichment import EntityEnricher
+    enricher = EntityEnricher()
+    try:
+        enricher.run(workers=args.workers, batch_size=args.batch_size)
+    finally:
+        enricher.cache.close()
+    return 0
+
+def cmd_registry_stats(args):
+    """Show how many movie IDs each collector has registered"""
+    from registry import MovieRegistry
+    registry = MovieRegistry()
+    for collector, total, ingested in registry.stats():
+        print(f"{collector:<20}{total} movie IDs, {ingested} ingested")
+    registry.close()
+    return 0
+
+def cmd_registry_sync(args):
+    """Mark movies already in the database as ingested"""
+    from registry import MovieRegistry
+    from tddb_api_scrapper import TMDBScrapper
+    registry = MovieRegistry()
+    try:
+        return 0 if TMDBScrapper(registry=registry).sync_registry() else 1
+    finally:
+        registry.close()
+
+def cmd_export_ids(args):
+    """Regenerate the scrapper ID module from a collector's JSON file"""
+    json_file, module_file = COLLECTOR_FILES[args.source]
+    with open(json_file, encoding='utf-8') as f:
+        movie_ids = json.load(f)['movie_ids']
+
+    if args.source == 'popular':
+        from get_popular_movies import MovieIDCollector as Collector
+    else:
+        from get_brazilian_movies import BrazilianMovieCollector as Collector
+    Collector.save_ids_for_scrapper(movie_ids, filename=module_file)
+    return 0
+
+def cmd_export_snapshot(args):
+    """Export the movie tables to Parquet/Arrow files"""
+    import snapshot
+    snapshot.export_snapshot(args.output, file_format=args.format, row_group_size=args.row_group_size)
+    return 0
+
+def cmd_graph_path(args):
+    """Print the shortest connection between two movies"""
+    from movie_graph import MovieGraph
+    graph = MovieGraph.from_snapshot(args.snapshot)
+    path = graph.shortest_path(args.from_movie, args.to_movie)
+    print(graph.describe_path(path) if path else "Movies are not connected")
+    return 0
+
+def cmd_graph_stats(args):
+    """Print degree and connectivity statistics of the movie graph"""
+    import numpy as np
+    from movie_graph import MovieGraph
+    graph = MovieGraph.from_snapshot(args.snapshot)
+    for label, values in (
+        ('people per movie', graph.movie_degree()),
+        ('movies per person', graph.person_degree()),
+        ('co-movies per movie', graph.neighbor_counts()),
+    ):
+        print(f"{label:<24}mean {values.mean():7.2f}  median {np.median(values):6.1f}  max {values.max()}")
+    labels = graph.component_labels()
+    print(f"{'components':<24}{len(np.unique(labels))} (largest {np.bincount(labels).max()} movies)")
+    return 0
+
+def cmd_graph_score(args):
+    """Compute per-movie difficulty and optionally write it to movie_stats"""
+    import movie_graph
+    graph = movie_graph.MovieGraph.from_snapshot(args.snapshot)
+    rows = graph.movie_stats(movie_graph.load_popularity())
+    if args.write:
+        movie_graph.write_movie_stats(rows)
+    else:
+        for movie_id, degree, neighbors, _, difficulty in sorted(rows, key=lambda row: row[4])[:20]:
+            print(f"{movie_id:<10}{graph.titles.get(movie_id, '')[:40]:<42}difficulty {difficulty:.3f}")
+    return 0
+
+def cmd_similarity_build(args):
+    """Update the synopsis similarity index and optionally write it to movie_similarity"""
+    import similarity
+    similarity.run(args.snapshot, args.index, k=args.k, full=args.full, write=args.write)
+    return 0
+
+def cmd_similarity_show(args):
+    """Print the movies whose synopsis is closest to a movie's"""
+    import similarity
+    import snapshot
+    index, _, _ = similarity.load_index(args.index)
+    if args.movie_id not in index:
+        print(f"Movie {args.movie_id} is not in {args.index}")
+        return 1
+
+    movie = snapshot.load_snapshot(args.snapshot, ['movie'])['movie']
+    titles = dict(zip(movie.column('movie_id').to_pylist(), movie.column('title').to_pylist()))
+    _, neighbours, scores = index[args.movie_id]
+    for neighbour, score in zip(neighbours, scores):
+        print(f"{neighbour:<10}{titles.get(neighbour, '')[:40]:<42}similarity {score:.3f}")
+    return 0
+
+def cmd_schedule(args):
+    """Fill today_movie for the coming days"""
+    from datetime import date
+    import scheduler
+    picks = scheduler.run(
+        days=args.days,
+        start=date.fromisoformat(args.start) if args.start else None,
+        snapshot_dir=args.snapshot,
+        brazilian_share=args.brazilian_share,
+        repeat_window=args.repeat_window,
+        dry_run=args.dry_run,
+    )
+    for day, movie_id in picks:
+        print(f"{day}  {movie_id}")
+    return 0
+
+def cmd_publish(args):
+    """Render scheduled days as static puzzle files for the app"""
+    from datetime import date
+    import publisher
+    index = publisher.run(
+        days=args.days,
+        start=date.fromisoformat(args.start) if args.start else None,
+        snapshot_dir=args.snapshot,
+        out_dir=args.output or publisher.DEFAULT_OUTPUT_DIR,
+    )
+    for day, puzzle_file in sorted(index['days'].items())[-args.days:]:
+        print(f"{day}  {puzzle_file}")
+    return 0
+
+def time_import(module):
+    """Time a cold import of a module in a fresh interpreter"""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-c', f'import {module}'],
+        cwd=BASE_DIR,
+        capture_output=True,
+    )
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    return elapsed_ms, result.returncode == 0
+
+def cmd_bench(args):
+    """Report cold import time of each module"""
+    baseline_ms, _ = time_import('sys')
+    print(f"{'interpreter':<28}{baseline_ms:8.1f} ms")
+    for module in BENCH_MODULES:
+        elapsed_ms, ok = time_import(module)
+        status = f"+{elapsed_ms - baseline_ms:.1f} ms" if ok else "import failed"
+        print(f"{module:<28}{elapsed_ms:8.1f} ms  ({status})")
+    return 0
+
+def cmd_status(args):
+    """Show configuration and collected ID counts without touching the network"""
+    for name in ('TMDB_BEARER_TOKEN', 'DATABASE_URL'):
+        print(f"{name:<20}{'set' if os.getenv(name) else 'missing'}")
+
+    for source, (json_file, module_file) in COLLECTOR_FILES.items():
+        if os.path.exists(json_file):
+            with open(json_file, encoding='utf-8') as f:
+                total = json.load(f).get('total_movies', 0)
+            print(f"{source:<20}{total} movie IDs ({json_file})")
+        else:
+            print(f"{source:<20}not collected")
+    return 0
+
+def build_parser():
+    """Build the argument parser with all subcommands"""
+    parser = argparse.ArgumentParser(prog='cli.py', description="The Movie Game data tools")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    collect = subparsers.add_parser('collect', help="collect movie IDs from TMDB")
+    collect.add_argument('collector', choices=sorted(COLLECTOR_FILES))
+    collect.add_argument('--target', type=int, help="number of movie IDs to collect")
+    collect.add_argument('--max-requests', type=int, help="budget of list/search page requests")
+    collect.set_defaults(func=cmd_collect)
+
+    ingest = subparsers.add_parser('ingest', help="fetch collected movies and write them to the database")
+    ingest.add_argument('--source', choices=sorted(COLLECTOR_FILES), default='brazilian')
+    ingest.add_argument('--fetch-workers', type=int, default=4, help="concurrent TMDB fetches")
+    ingest.add_argument('--batch-size', type=int, default=10, help="movies written per transaction")
+    ingest.add_argument('--refresh', action='store_true', help="re-ingest movies already in the database")
+    ingest.set_defaults(func=cmd_ingest)
+
+    enrich = subparsers.add_parser('enrich', help="fill missing birthdates and countries of people and companies")
+    enrich.add_argument('--workers', type=int, default=8, help="concurrent TMDB fetches")
+    enrich.add_argument('--batch-size', type=int, default=100, help="entities updated per transaction")
+    enrich.set_defaults(func=cmd_enrich)
+
+    registry = subparsers.add_parser('registry', help="inspect the seen movie ID registry")
+    registry_actions = registry.add_subparsers(dest='action', required=True)
+    registry_actions.add_parser('stats', help="count known IDs per collector").set_defaults(func=cmd_registry_stats)
+    registry_actions.add_parser('sync', help="import IDs already in the movie table").set_defaults(func=cmd_registry_sync)
+
+    export = subparsers.add_parser('export', help="export collected data")
+    export_targets = export.add_subparsers(dest='target', required=True)
+    export_ids = export_targets.add_parser('ids', help="regenerate the scrapper ID module from JSON")
+    export_ids.add_argument('--source', choices=sorted(COLLECTOR_FILES), default='brazilian')
+    export_ids.set_defaults(func=cmd_export_ids)
+    export_snapshot = export_targets.add_parser('snapshot', help="write the movie tables to Parquet/Arrow files")
+    export_snapshot.add_argument('--output', default=data_path('snapshot'), help="snapshot directory")
+    export_snapshot.add_argument('--format', choices=['parquet', 'arrow'], default='parquet')
+    export_snapshot.add_argument('--row-group-size', type=int, default=50000)
+    export_snapshot.set_defaults(func=cmd_export_snapshot)
+
+    graph = subparsers.add_parser('graph', help="movie-person graph hints and difficulty")
+    graph_actions = graph.add_subparsers(dest='action', required=True)
+    graph_path = graph_actions.add_parser('path', help="shortest connection between two movies")
+    graph_path.add_argument('from_movie', type=int)
+    graph_path.add_argument('to_movie', type=int)
+    graph_path.set_defaults(func=cmd_graph_path)
+    graph_stats = graph_actions.add_parser('stats', help="degree and connectivity statistics")
+    graph_stats.set_defaults(func=cmd_graph_stats)
+    graph_score = graph_actions.add_parser('score', help="per-movie difficulty scores")
+    graph_score.add_argument('--write', action='store_true', help="upsert scores into movie_stats")
+    graph_score.set_defaults(func=cmd_graph_score)
+    for action in (graph_path, graph_stats, graph_score):
+        action.add_argument('--snapshot', default=data_path('snapshot'), help="snapshot directory")
+
+    similarity = subparsers.add_parser('similarity', help="synopsis similarity between movies")
+    similarity_actions = similarity.add_subparsers(dest='action', required=True)
+    similarity_build = similarity_actions.add_parser('build', help="update top-k similar movies for new or changed synopses")
+    similarity_build.add_argument('--k', type=int, default=10, help="similar movies kept per movie")
+    similarity_build.add_argument('--full', action='store_true', help="ignore the existing index and rebuild everything")
+    similarity_build.add_argument('--write', action='store_true', help="write updated lists to movie_similarity")
+    similarity_build.set_defaults(func=cmd_similarity_build)
+    similarity_show = similarity_actions.add_parser('show', help="movies with the closest synopsis")
+    similarity_show.add_argument('movie_id', type=int)
+    similarity_show.set_defaults(func=cmd_similarity_show)
+    for action in (similarity_build, similarity_show):
+        action.add_argument('--snapshot', default=data_path('snapshot'), help="snapshot directory")
+        action.add_argument('--index', default=data_path('similarity_index.parquet'), help="neighbour index file")
+
+    schedule = subparsers.add_parser('schedule', help="precompute today_movie for the coming days")
+    schedule.add_argument('--days', type=int, default=30)
+    schedule.add_argument('--start', help="first day to schedule (default: today)")
+    schedule.add_argument('--snapshot', default=data_path('snapshot'), help="snapshot directory")
+    schedule.add_argument('--brazilian-share', type=float, default=0.2)
+    schedule.add_argument('--repeat-window', type=int, default=365, help="days before a movie can repeat")
+    schedule.add_argument('--dry-run', action='store_true', help="print the schedule without writing it")
+    schedule.set_defaults(func=cmd_schedule)
+
+    publish = subparsers.add_parser('publish', help="write static daily puzzle files for the app")
+    publish.add_argument('--days', type=int, default=1, help="days to publish, starting with --start (never after today)")
+    publish.add_argument('--start', help="first day to publish (default: today)")
+    publish.add_argument('--snapshot', default=data_path('snapshot'), help="snapshot directory")
+    publish.add_argument('--output', help="output directory (default: app/public/daily)")
+    publish.set_defaults(func=cmd_publish)
+
+    bench = subparsers.add_parser('bench', help="measure module import times")
+    bench.set_defaults(func=cmd_bench)
+
+    status = subparsers.add_parser('status', help="show configuration and collected data")
+    status.set_defaults(func=cmd_status)
+
+    return parser
+
+def main(argv=None):
+    """Parse arguments and run the selected subcommand"""
+    args = build_parser().parse_args(argv)
+    setup()
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
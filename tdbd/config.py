@@ -0,0 +1,37 @@
+import os
+import logging
+
+# Data files (registry, collector output, snapshots, caches) live next to the code,
+# so jobs started from another directory (e.g. cron) share them
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+_configured = False
+
+def setup(level=logging.INFO):
+    """Load .env variables and configure logging (only once per process)"""
+    global _configured
+    if _configured:
+        return
+
+    # dotenv is optional: plain environment variables work without it
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+
+    logging.basicConfig(level=level, format=LOG_FORMAT)
+    _configured = True
+
+def data_path(*parts):
+    """Absolute path of a data file in the package directory"""
+    return os.path.join(BASE_DIR, *parts)
+
+def get_env(name, required=True):
+    """Read a configuration value from the environment"""
+    value = os.getenv(name)
+    if required and not value:
+        raise ValueError(f"{name} not found in environment variables")
+    return value
@@ -0,0 +1,19 @@
+import logging
+from config import get_env
+
+logger = logging.getLogger(__name__)
+
+def connect(db_url=None, dict_rows=True):
+    """Connect to the Neon PostgreSQL database
+
+    Rows come back as dicts (RealDictCursor) unless dict_rows is False, which
+    is cheaper for bulk reads that only need tuples.
+    """
+    # Imported here so modules using this helper stay importable without psycopg2
+    import psycopg2
+    from psycopg2.extras import RealDictCursor
+
+    return psycopg2.connect(
+        db_url or get_env('DATABASE_URL'),
+        cursor_factory=RealDictCursor if dict_rows else None
+    )
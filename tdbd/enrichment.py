@@ -0,0 +1,278 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+import logging
+from datetime import date, datetime, timezone
+
+import db
+import tmdb
+from config import data_path, get_env
+from pipeline import Pipeline, Stage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = data_path('enrichment_cache.sqlite3')
+
+# One TMDB person can be an actor, director and writer at once, so persons are
+# collected across the three tables and fetched once. The actor table has no
+# origin_country column.
+PERSON_TABLES = [
+    ('actor', 'actor_id', ('birthdate',)),
+    ('director', 'director_id', ('birthdate', 'origin_country')),
+    ('writer', 'writer_id', ('birthdate', 'origin_country')),
+]
+
+MISSING_PERSONS_QUERY = """
+SELECT actor_id FROM movies_data.actor WHERE birthdate IS NULL
+UNION
+SELECT director_id FROM movies_data.director WHERE birthdate IS NULL OR COALESCE(origin_country, '') !~ '^[A-Z]{2}$'
+UNION
+SELECT writer_id FROM movies_data.writer WHERE birthdate IS NULL OR COALESCE(origin_country, '') !~ '^[A-Z]{2}$'
+"""
+
+# TMDB's /company endpoint has no founding date, so only origin_country can be filled
+MISSING_COMPANIES_QUERY = """
+SELECT producer_id FROM movies_data.producer WHERE COALESCE(origin_country, '') = ''
+"""
+
+# Only these response fields are cached; person biographies can be long
+CACHED_FIELDS = {
+    'person': ('birthday', 'place_of_birth'),
+    'company': ('origin_country',),
+}
+
+# ISO 3166-1 codes for the country spellings TMDB's place_of_birth uses most,
+# keyed by lowercase, accent- and dot-free name (English and Portuguese)
+COUNTRY_CODES = {
+    'usa': 'US', 'us': 'US', 'united states': 'US', 'united states of america': 'US', 'estados unidos': 'US', 'eua': 'US',
+    'uk': 'GB', 'united kingdom': 'GB', 'great britain': 'GB', 'england': 'GB', 'scotland': 'GB', 'wales': 'GB',
+    'northern ireland': 'GB', 'reino unido': 'GB', 'inglaterra': 'GB',
+    'brazil': 'BR', 'brasil': 'BR',
+    'portugal': 'PT', 'argentina': 'AR', 'mexico': 'MX', 'chile': 'CL', 'colombia': 'CO', 'uruguay': 'UY',
+    'uruguai': 'UY', 'peru': 'PE', 'cuba': 'CU', 'canada': 'CA', 'australia': 'AU', 'new zealand': 'NZ',
+    'france': 'FR', 'franca': 'FR', 'germany': 'DE', 'west germany': 'DE', 'east germany': 'DE', 'alemanha': 'DE',
+    'italy': 'IT', 'italia': 'IT', 'spain': 'ES', 'espanha': 'ES', 'espana': 'ES', 'ireland': 'IE', 'irlanda': 'IE',
+    'netherlands': 'NL', 'holanda': 'NL', 'belgium': 'BE', 'belgica': 'BE', 'switzerland': 'CH', 'suica': 'CH',
+    'austria': 'AT', 'sweden': 'SE', 'suecia': 'SE', 'denmark': 'DK', 'norway': 'NO', 'finland': 'FI',
+    'poland': 'PL', 'czech republic': 'CZ', 'czechia': 'CZ', 'hungary': 'HU', 'greece': 'GR', 'russia': 'RU',
+    'russian federation': 'RU', 'ukraine': 'UA', 'turkey': 'TR', 'israel': 'IL', 'iran': 'IR', 'egypt': 'EG',
+    'south africa': 'ZA', 'nigeria': 'NG', 'india': 'IN', 'china': 'CN', 'hong kong': 'HK', 'taiwan': 'TW',
+    'japan': 'JP', 'japao': 'JP', 'south korea': 'KR', 'korea': 'KR', 'coreia do sul': 'KR', 'philippines': 'PH',
+}
+
+# Existing values always win over TMDB's, except countries that are not ISO codes
+# (free text written by earlier versions of this pass)
+ASSIGNMENTS = {
+    'birthdate': "birthdate = COALESCE(t.birthdate, v.birthdate)",
+    'origin_country': "origin_country = CASE WHEN t.origin_country ~ '^[A-Z]{2}$' THEN t.origin_country ELSE v.origin_country END",
+}
+
+class ResponseCache:
+    """SQLite cache of TMDB person/company responses, so reruns only fetch what is new"""
+    def __init__(self, path=None):
+        self.path = path or os.getenv('ENRICHMENT_CACHE_PATH', DEFAULT_CACHE_PATH)
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS tmdb_response (
+                kind TEXT NOT NULL,
+                entity_id INTEGER NOT NULL,
+                payload TEXT NOT NULL,
+                fetched_at TEXT NOT NULL,
+                PRIMARY KEY (kind, entity_id)
+            )
+        """)
+        self.connection.commit()
+
+    def cached_ids(self, kind):
+        with self._lock:
+            rows = self.connection.execute("SELECT entity_id FROM tmdb_response WHERE kind = ?", (kind,)).fetchall()
+        return {entity_id for (entity_id,) in rows}
+
+    def get(self, kind, entity_ids):
+        """Cached payloads for the given IDs, as entity_id -> dict"""
+        payloads = {}
+        with self._lock:
+            for entity_id in entity_ids:
+                row = self.connection.execute(
+                    "SELECT payload FROM tmdb_response WHERE kind = ? AND entity_id = ?", (kind, entity_id)
+                ).fetchone()
+                if row:
+                    payloads[entity_id] = json.loads(row[0])
+        return payloads
+
+    def put_many(self, kind, payloads):
+        now = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        with self._lock:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO tmdb_response (kind, entity_id, payload, fetched_at) VALUES (?, ?, ?, ?)",
+                [(kind, entity_id, json.dumps(payload, ensure_ascii=False), now) for entity_id, payload in payloads]
+            )
+            self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+def parse_birthdate(value):
+    try:
+        return date.fromisoformat(value).isoformat() if value else None
+    except ValueError:
+        return None
+
+def _country_key(name):
+    decomposed = unicodedata.normalize('NFKD', name.casefold())
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).replace('.', '').strip()
+
+def country_code(place_of_birth):
+    """'São Paulo, São Paulo, Brazil' -> 'BR'; None when the country is not recognised
+
+    producer.origin_country holds TMDB's ISO 3166-1 codes, so people get the
+    same encoding. Names outside COUNTRY_CODES are looked up with pycountry
+    when it is installed.
+    """
+    if not place_of_birth:
+        return None
+    renamed = re.search(r'\[now ([^\]]+)\]', place_of_birth)
+    name = renamed.group(1) if renamed else re.sub(r'\[.*?\]', '', place_of_birth).split(',')[-1]
+    code = COUNTRY_CODES.get(_country_key(name))
+    if code:
+        return code
+    try:
+        import pycountry
+        return pycountry.countries.lookup(name.strip()).alpha_2
+    except (ImportError, LookupError):
+        return None
+
+class EntityEnricher:
+    """Fill birthdate/origin_country of people and origin_country of producers from TMDB.
+
+    Runs as its own pass over the whole catalog: the distinct IDs missing
+    data are gathered in one query, responses not cached yet are fetched
+    concurrently, and the rows are bulk-updated one batch at a time. Each
+    batch is cached before it is committed, and cached responses are applied
+    at the start of every run, so an interrupted or failed run resumes where
+    it stopped without refetching.
+    """
+    def __init__(self, cache=None):
+        self.tmdb_token = get_env('TMDB_BEARER_TOKEN')
+        self.cache = cache or ResponseCache()
+
+    def get_entity(self, kind, entity_id):
+        """Fetch /person/{id} or /company/{id}; {} when TMDB does not know the ID"""
+        url = f"https://api.themoviedb.org/3/{kind}/{entity_id}"
+        headers = {
+            "Authorization": f"Bearer {self.tmdb_token}",
+            "accept": "application/json"
+        }
+
+        try:
+            response = tmdb.get(url, headers)
+            if response.status_code == 200:
+                return response.json()
+            elif response.status_code == 404:
+                return {}
+            else:
+                logger.error(f"TMDB {kind} API error for ID {entity_id}: {response.status_code}")
+                return None
+        except Exception as e:
+            logger.error(f"{kind.capitalize()} request failed for ID {entity_id}: {e}")
+            return None
+
+    def missing_ids(self, connection, query):
+        with connection.cursor() as cursor:
+            cursor.execute(query)
+            return sorted({entity_id for (entity_id,) in cursor.fetchall()})
+
+    def update_persons(self, connection, payloads):
+        """Bulk update every person table from person payloads"""
+        from psycopg2.extras import execute_values
+
+        rows = [
+            (person_id, parse_birthdate(payload.get('birthday')), country_code(payload.get('place_of_birth')))
+            for person_id, payload in payloads
+        ]
+        rows = [row for row in rows if row[1] or row[2]]
+        if not rows:
+            return 0
+
+        with connection.cursor() as cursor:
+            for table, key, columns in PERSON_TABLES:
+                assignments = ', '.join(ASSIGNMENTS[column] for column in columns)
+                execute_values(cursor, f"""
+                    UPDATE movies_data.{table} AS t SET {assignments}
+                    FROM (VALUES %s) AS v(id, birthdate, origin_country)
+                    WHERE t.{key} = v.id
+                """, rows, template="(%s, %s::date, %s)")
+        return len(rows)
+
+    def update_companies(self, connection, payloads):
+        """Bulk update producer.origin_country from company payloads"""
+        from psycopg2.extras import execute_values
+
+        rows = [(company_id, payload.get('origin_country')[:50]) for company_id, payload in payloads
+                if payload.get('origin_country')]
+        if not rows:
+            return 0
+
+        with connection.cursor() as cursor:
+            execute_values(cursor, """
+                UPDATE movies_data.producer AS t SET origin_country = v.origin_country
+                FROM (VALUES %s) AS v(id, origin_country)
+                WHERE t.producer_id = v.id AND COALESCE(t.origin_country, '') = ''
+            """, rows)
+        return len(rows)
+
+    def enrich(self, kind, query, update, workers=8, batch_size=100):
+        """Fetch missing entities of one kind ('person' or 'company') and update the database"""
+        connection = db.connect(dict_rows=False)
+        try:
+            missing = self.missing_ids(connection, query)
+            cached = self.cache.cached_ids(kind)
+            to_fetch = [entity_id for entity_id in missing if entity_id not in cached]
+            logger.info(f"{len(missing)} {kind} IDs missing data, {len(to_fetch)} not fetched yet")
+
+            # Responses cached by an earlier (possibly interrupted) run are applied first
+            already_fetched = [entity_id for entity_id in missing if entity_id in cached]
+            if already_fetched:
+                update(connection, list(self.cache.get(kind, already_fetched).items()))
+                connection.commit()
+
+            updated = 0
+
+            def fetch(entity_id):
+                payload = self.get_entity(kind, entity_id)
+                if payload is None:
+                    return None
+                return entity_id, {field: payload.get(field) for field in CACHED_FIELDS[kind]}
+
+            def write(batch):
+                nonlocal updated
+                # Cached first: if the update fails, the next run applies it without refetching
+                self.cache.put_many(kind, batch)
+                try:
+                    updated += update(connection, batch)
+                    connection.commit()
+                except Exception as e:
+                    logger.error(f"{kind.capitalize()} batch update failed: {e}")
+                    connection.rollback()
+                    raise
+                logger.info(f"✓ Enriched {len(batch)} {kind} IDs")
+                return batch
+
+            Pipeline([
+                Stage('fetch', fetch, workers=workers),
+                Stage('write', write, batch_size=batch_size),
+            ]).run(to_fetch)
+        finally:
+            connection.close()
+
+        logger.info(f"✓ {kind.capitalize()} enrichment complete: {updated} IDs with new data")
+        return updated
+
+    def run(self, workers=8, batch_size=100):
+        persons = self.enrich('person', MISSING_PERSONS_QUERY, self.update_persons, workers, batch_size)
+        companies = self.enrich('company', MISSING_COMPANIES_QUERY, self.update_companies, workers, batch_size)
+        return persons, companies
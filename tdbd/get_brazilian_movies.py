@@ -1,21 +1,17 @@
 import requests
-import os
 import json
-from dotenv import load_dotenv
+import os
+from config import data_path, setup, get_env
+from registry import MovieRegistry
+from pagination import PagedStrategy, PaginationPlanner
 import logging
 
-# Load environment variables
-load_dotenv()
-
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class BrazilianMovieCollector:
-    def __init__(self):
-        self.tmdb_token = os.getenv('TMDB_BEARER_TOKEN')
-        if not self.tmdb_token:
-            raise ValueError("TMDB_BEARER_TOKEN not found in environment variables")
+    def __init__(self, registry=None):
+        self.tmdb_token = get_env('TMDB_BEARER_TOKEN')
+        self.registry = registry
     
     def discover_brazilian_movies(self, page=1, sort_by="popularity.desc", min_vote_count=10):
         """Discover Brazilian movies using TMDB API"""
@@ -106,10 +102,80 @@ class BrazilianMovieCollector:
         
         return False
     
-    def collect_brazilian_movie_ids(self, target_count=100):
+    def resume_strategies(self, strategies):
+        """Start each strategy after the pages earlier runs already fetched"""
+        if self.registry:
+            for strategy in strategies:
+                strategy.resume_after(*self.registry.strategy_progress('brazilian', strategy.name))
+    
+    def save_progress(self, strategy):
+        if self.registry and strategy.pages_fetched:
+            self.registry.save_strategy_progress('brazilian', strategy.name, strategy.last_fetched, strategy.total_pages)
+    
+    def is_known(self, movie_id):
+        """Check whether an earlier run already verified a movie, Brazilian or not"""
+        return bool(self.registry) and self.registry.is_checked(movie_id, 'brazilian')
+    
+    def collect_from_planner(self, planner, brazilian_movies, movie_details_list, checked, target_count):
+        """Fetch pages chosen by the planner and keep the verified Brazilian movies"""
+        self.resume_strategies(planner.strategies)
+        while len(brazilian_movies) < target_count:
+            step = planner.next_page()
+            if not step:
+                break
+            
+            strategy, page = step
+            data = strategy.fetch(page)
+            new_count = 0
+            
+            for movie in (data or {}).get('results') or []:
+                if len(brazilian_movies) >= target_count:
+                    break
+                
+                movie_id = movie['id']
+                # checked also holds rejected IDs, so no movie is verified twice per run
+                if movie_id in checked or self.is_known(movie_id):
+                    continue
+                checked.add(movie_id)
+                
+                # Get detailed info to verify it's Brazilian
+                details = self.get_movie_details(movie_id)
+                is_brazilian = self.is_brazilian_movie(details)
+                # Failed requests are not recorded, so the movie is verified again next run
+                if self.registry and details:
+                    self.registry.record_check(movie_id, 'brazilian', is_brazilian)
+                
+                if is_brazilian:
+                    brazilian_movies.add(movie_id)
+                    new_count += 1
+                    if self.registry:
+                        self.registry.record(movie_id, 'brazilian', strategy.name)
+                    movie_details_list.append({
+                        'id': movie_id,
+                        'title': movie['title'],
+                        'original_title': movie.get('original_title', ''),
+                        'release_date': movie.get('release_date', ''),
+                        'vote_average': movie.get('vote_average', 0),
+                        'popularity': movie.get('popularity', 0),
+                        'overview': movie.get('overview', ''),
+                        'original_language': details.get('original_language', ''),
+                        'production_countries': [country['name'] for country in details.get('production_countries', [])],
+                        'strategy': strategy.name
+                    })
+                    
+                    logger.info(f"Found Brazilian movie: {movie['title']} ({movie_id})")
+            
+            planner.record(strategy, data, new_count)
+            self.save_progress(strategy)
+            logger.info(f"{strategy.name} page {page}: Found {len(brazilian_movies)} Brazilian movies so far")
+        
+        planner.log_summary()
+    
+    def collect_brazilian_movie_ids(self, target_count=100, max_requests=None):
         """Collect Brazilian movie IDs from various strategies"""
         brazilian_movies = set()  # Use set to avoid duplicates
         movie_details_list = []  # Store detailed movie info
+        checked = set()  # Every ID whose details were fetched this run
         
         # Strategy 1: Discover by origin country with different sorting
         discover_strategies = [
@@ -119,50 +185,16 @@ class BrazilianMovieCollector:
             ("revenue.desc", "Highest Revenue")
         ]
         
-        for sort_by, strategy_name in discover_strategies:
-            logger.info(f"Collecting Brazilian movies by {strategy_name}...")
-            page = 1
-            
-            while len(brazilian_movies) < target_count and page <= 50:
-                data = self.discover_brazilian_movies(page, sort_by, min_vote_count=5)
-                
-                if not data or 'results' not in data or not data['results']:
-                    break
-                
-                for movie in data['results']:
-                    if len(brazilian_movies) >= target_count:
-                        break
-                    
-                    movie_id = movie['id']
-                    if movie_id not in brazilian_movies:
-                        # Get detailed info to verify it's Brazilian
-                        details = self.get_movie_details(movie_id)
-                        
-                        if self.is_brazilian_movie(details):
-                            brazilian_movies.add(movie_id)
-                            movie_details_list.append({
-                                'id': movie_id,
-                                'title': movie['title'],
-                                'original_title': movie.get('original_title', ''),
-                                'release_date': movie.get('release_date', ''),
-                                'vote_average': movie.get('vote_average', 0),
-                                'popularity': movie.get('popularity', 0),
-                                'overview': movie.get('overview', ''),
-                                'original_language': details.get('original_language', ''),
-                                'production_countries': [country['name'] for country in details.get('production_countries', [])],
-                                'strategy': f"discover_{sort_by}"
-                            })
-                            
-                            logger.info(f"Found Brazilian movie: {movie['title']} ({movie_id})")
-                
-                page += 1
-                logger.info(f"{strategy_name}: Found {len(brazilian_movies)} Brazilian movies so far")
-                
-                if len(brazilian_movies) >= target_count:
-                    break
-            
-            if len(brazilian_movies) >= target_count:
-                break
+        logger.info("Collecting Brazilian movies with discover...")
+        planner = PaginationPlanner([
+            PagedStrategy(
+                f"discover_{sort_by}",
+                lambda page, sort_by=sort_by: self.discover_brazilian_movies(page, sort_by, min_vote_count=5),
+                max_pages=50
+            )
+            for sort_by, _ in discover_strategies
+        ], max_requests=max_requests)
+        self.collect_from_planner(planner, brazilian_movies, movie_details_list, checked, target_count)
         
         # Strategy 2: Search with Brazilian-related terms if we need more
         if len(brazilian_movies) < target_count:
@@ -171,51 +203,37 @@ class BrazilianMovieCollector:
                 "rio de janeiro", "são paulo", "favela", "ditadura"
             ]
             
-            for term in search_terms:
-                if len(brazilian_movies) >= target_count:
-                    break
-                
-                logger.info(f"Searching for movies with term: {term}")
-                page = 1
-                
-                while len(brazilian_movies) < target_count and page <= 10:
-                    data = self.search_brazilian_movies(term, page)
-                    
-                    if not data or 'results' not in data or not data['results']:
-                        break
-                    
-                    for movie in data['results']:
-                        if len(brazilian_movies) >= target_count:
-                            break
-                        
-                        movie_id = movie['id']
-                        if movie_id not in brazilian_movies:
-                            details = self.get_movie_details(movie_id)
-                            
-                            if self.is_brazilian_movie(details):
-                                brazilian_movies.add(movie_id)
-                                movie_details_list.append({
-                                    'id': movie_id,
-                                    'title': movie['title'],
-                                    'original_title': movie.get('original_title', ''),
-                                    'release_date': movie.get('release_date', ''),
-                                    'vote_average': movie.get('vote_average', 0),
-                                    'popularity': movie.get('popularity', 0),
-                                    'overview': movie.get('overview', ''),
-                                    'original_language': details.get('original_language', ''),
-                                    'production_countries': [country['name'] for country in details.get('production_countries', [])],
-                                    'strategy': f"search_{term}"
-                                })
-                                
-                                logger.info(f"Found Brazilian movie via search: {movie['title']} ({movie_id})")
-                    
-                    page += 1
-                
-                logger.info(f"Search '{term}': Found {len(brazilian_movies)} total Brazilian movies")
+            logger.info("Searching for movies with Brazilian terms...")
+            remaining = None if max_requests is None else max(0, max_requests - planner.requests)
+            planner = PaginationPlanner([
+                PagedStrategy(f"search_{term}", lambda page, term=term: self.search_brazilian_movies(term, page), max_pages=10)
+                for term in search_terms
+            ], max_requests=remaining)
+            self.collect_from_planner(planner, brazilian_movies, movie_details_list, checked, target_count)
         
         return list(brazilian_movies), movie_details_list
     
-    def save_brazilian_movies(self, movie_ids, movie_details, filename="brazilian_movies_100.json"):
+    def load_saved_movies(self, filename=data_path("brazilian_movies_100.json")):
+        """Load the IDs and details saved by earlier runs, if any"""
+        if not os.path.exists(filename):
+            return [], []
+        with open(filename, encoding='utf-8') as f:
+            data = json.load(f)
+        return data.get('movie_ids', []), data.get('movie_details', [])
+    
+    def merge_with_saved(self, movie_ids, movie_details, filename=data_path("brazilian_movies_100.json")):
+        """Append newly collected movies to the saved ones
+        
+        New IDs exclude movies found by earlier runs, so saving them alone
+        would drop movies that may not be ingested yet.
+        """
+        saved_ids, saved_details = self.load_saved_movies(filename)
+        known = set(saved_ids)
+        new_ids = [movie_id for movie_id in movie_ids if movie_id not in known]
+        new_details = [detail for detail in movie_details if detail['id'] not in known]
+        return saved_ids + new_ids, saved_details + new_details
+    
+    def save_brazilian_movies(self, movie_ids, movie_details, filename=data_path("brazilian_movies_100.json")):
         """Save Brazilian movie IDs and details to JSON file"""
         data = {
             "total_movies": len(movie_ids),
@@ -231,20 +249,18 @@ class BrazilianMovieCollector:
         
         logger.info(f"Saved {len(movie_ids)} Brazilian movie IDs to {filename}")
     
-    def save_ids_for_scrapper(self, movie_ids, filename="brazilian_movies_for_scrapper.py"):
+    @staticmethod
+    def save_ids_for_scrapper(movie_ids, filename=data_path("brazilian_movies_for_scrapper.py")):
         """Save Brazilian movie IDs in Python format for the scrapper"""
         content = f"""# Auto-generated Brazilian movie IDs for TMDB scrapper
 # Generated on 2025-09-26
 # Total Brazilian movies: {len(movie_ids)}
 
-BRAZILIAN_MOVIE_IDS = {movie_ids}
+MOVIE_IDS = {movie_ids}
 
 # Split into batches of 25 for processing (smaller batches for detailed movies)
 BATCH_SIZE = 25
-BRAZILIAN_MOVIE_BATCHES = [BRAZILIAN_MOVIE_IDS[i:i+BATCH_SIZE] for i in range(0, len(BRAZILIAN_MOVIE_IDS), BATCH_SIZE)]
-
-print(f"Total Brazilian movies: {{len(BRAZILIAN_MOVIE_IDS)}}")
-print(f"Total batches: {{len(BRAZILIAN_MOVIE_BATCHES)}}")
+MOVIE_BATCHES = [MOVIE_IDS[i:i+BATCH_SIZE] for i in range(0, len(MOVIE_IDS), BATCH_SIZE)]
 """
         
         with open(filename, 'w', encoding='utf-8') as f:
@@ -252,22 +268,26 @@ print(f"Total batches: {{len(BRAZILIAN_MOVIE_BATCHES)}}")
         
         logger.info(f"Saved Brazilian movie IDs for scrapper to {filename}")
 
-def main():
+def main(target_count=100, registry=None, max_requests=None):
     """Main execution function for collecting Brazilian movies"""
-    collector = BrazilianMovieCollector()
+    collector = BrazilianMovieCollector(registry=registry or MovieRegistry())
     
-    logger.info("Starting to collect 100 Brazilian movie IDs from TMDB...")
+    logger.info(f"Starting to collect {target_count} Brazilian movie IDs from TMDB...")
     
     # Collect Brazilian movie IDs
-    movie_ids, movie_details = collector.collect_brazilian_movie_ids(target_count=100)
+    movie_ids, movie_details = collector.collect_brazilian_movie_ids(target_count=target_count, max_requests=max_requests)
     
     logger.info(f"✓ Collected {len(movie_ids)} unique Brazilian movie IDs")
     
+    # Keep the movies found by earlier runs in the output files
+    all_ids, all_details = collector.merge_with_saved(movie_ids, movie_details)
+    logger.info(f"✓ {len(all_ids)} Brazilian movie IDs in total with earlier runs")
+    
     # Save to JSON file
-    collector.save_brazilian_movies(movie_ids, movie_details)
+    collector.save_brazilian_movies(all_ids, all_details)
     
     # Save for scrapper usage
-    collector.save_ids_for_scrapper(movie_ids)
+    collector.save_ids_for_scrapper(all_ids)
     
     # Display some statistics
     strategies = {}
@@ -310,9 +330,10 @@ def main():
     
     logger.info("✓ Brazilian movie ID collection completed successfully")
     
-    return movie_ids
+    return all_ids
 
 if __name__ == "__main__":
+    setup()
     movie_ids = main()
     print(f"\nTotal Brazilian movies collected: {len(movie_ids)}")
     print(f"First 10 Brazilian movie IDs: {movie_ids[:10]}")
\ No newline at end of file
@@ -1,21 +1,17 @@
 import requests
-import os
 import json
-from dotenv import load_dotenv
+import os
+from config import data_path, setup, get_env
+from registry import MovieRegistry
+from pagination import PagedStrategy, PaginationPlanner
 import logging
 
-# Load environment variables
-load_dotenv()
-
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class MovieIDCollector:
-    def __init__(self):
-        self.tmdb_token = os.getenv('TMDB_BEARER_TOKEN')
-        if not self.tmdb_token:
-            raise ValueError("TMDB_BEARER_TOKEN not found in environment variables")
+    def __init__(self, registry=None):
+        self.tmdb_token = get_env('TMDB_BEARER_TOKEN')
+        self.registry = registry
     
     def get_popular_movies(self, page=1):
         """Get popular movies from TMDB API"""
@@ -118,7 +114,21 @@ class MovieIDCollector:
             logger.error(f"Discover request failed for page {page}: {e}")
             return None
     
-    def collect_movie_ids(self, target_count=500):
+    def resume_strategies(self, strategies):
+        """Start each strategy after the pages earlier runs already fetched"""
+        if self.registry:
+            for strategy in strategies:
+                strategy.resume_after(*self.registry.strategy_progress('popular', strategy.name))
+    
+    def save_progress(self, strategy):
+        if self.registry and strategy.pages_fetched:
+            self.registry.save_strategy_progress('popular', strategy.name, strategy.last_fetched, strategy.total_pages)
+    
+    def is_known(self, movie_id):
+        """Check whether a movie was already found by an earlier popular collector run"""
+        return bool(self.registry) and self.registry.is_known(movie_id, 'popular')
+    
+    def collect_movie_ids(self, target_count=500, max_requests=None):
         """Collect movie IDs from various endpoints"""
         movie_ids = set()  # Use set to avoid duplicates
         movie_details = []  # Store basic movie info
@@ -135,44 +145,69 @@ class MovieIDCollector:
             ("discover_release", lambda page: self.discover_movies(page, "release_date.desc"))
         ]
         
-        for strategy_name, strategy_func in strategies:
-            logger.info(f"Collecting from {strategy_name}...")
-            page = 1
+        # Up to 25 pages per strategy, spent on whichever still yields new movies
+        planner = PaginationPlanner(
+            [PagedStrategy(name, func, max_pages=25) for name, func in strategies],
+            max_requests=max_requests
+        )
+        self.resume_strategies(planner.strategies)
+        
+        while len(movie_ids) < target_count:
+            step = planner.next_page()
+            if not step:
+                break
             
-            while len(movie_ids) < target_count and page <= 25:  # TMDB limits to 500 pages, but 25 should be enough
-                data = strategy_func(page)
-                
-                if not data or 'results' not in data:
-                    break
-                
-                for movie in data['results']:
-                    if len(movie_ids) >= target_count:
-                        break
-                    
-                    movie_id = movie['id']
-                    if movie_id not in movie_ids:
-                        movie_ids.add(movie_id)
-                        movie_details.append({
-                            'id': movie_id,
-                            'title': movie['title'],
-                            'release_date': movie.get('release_date', ''),
-                            'vote_average': movie.get('vote_average', 0),
-                            'popularity': movie.get('popularity', 0),
-                            'source': strategy_name
-                        })
-                
-                page += 1
-                logger.info(f"{strategy_name}: Collected {len(movie_ids)} unique movies so far")
-                
+            strategy, page = step
+            data = strategy.fetch(page)
+            new_count = 0
+            
+            for movie in (data or {}).get('results') or []:
                 if len(movie_ids) >= target_count:
                     break
+                
+                movie_id = movie['id']
+                if movie_id not in movie_ids and not self.is_known(movie_id):
+                    movie_ids.add(movie_id)
+                    new_count += 1
+                    if self.registry:
+                        self.registry.record(movie_id, 'popular', strategy.name)
+                    movie_details.append({
+                        'id': movie_id,
+                        'title': movie['title'],
+                        'release_date': movie.get('release_date', ''),
+                        'vote_average': movie.get('vote_average', 0),
+                        'popularity': movie.get('popularity', 0),
+                        'source': strategy.name
+                    })
             
-            if len(movie_ids) >= target_count:
-                break
+            planner.record(strategy, data, new_count)
+            self.save_progress(strategy)
+            logger.info(f"{strategy.name} page {page}: Collected {len(movie_ids)} unique movies so far")
         
+        planner.log_summary()
         return list(movie_ids), movie_details
     
-    def save_movie_ids(self, movie_ids, movie_details, filename="movie_ids_500.json"):
+    def load_saved_movies(self, filename=data_path("movie_ids_500.json")):
+        """Load the IDs and details saved by earlier runs, if any"""
+        if not os.path.exists(filename):
+            return [], []
+        with open(filename, encoding='utf-8') as f:
+            data = json.load(f)
+        return data.get('movie_ids', []), data.get('movie_details', [])
+    
+    def merge_with_saved(self, movie_ids, movie_details, filename=data_path("movie_ids_500.json")):
+        """Append newly collected movies to the saved ones
+        
+        New IDs exclude movies found by earlier runs, so saving them alone
+        would drop movies that may not be ingested yet.
+        """
+        saved_ids, saved_details = self.load_saved_movies(filename)
+        known = set(saved_ids)
+        new_ids = [movie_id for movie_id in movie_ids if movie_id not in known]
+        new_details = [detail for detail in movie_details if detail['id'] not in known]
+        return saved_ids + new_ids, saved_details + new_details
+    
+    def save_movie_ids(self, movie_ids, movie_details, filename=data_path("movie_ids_500.json")):
         """Save movie IDs and details to JSON file"""
         data = {
             "total_movies": len(movie_ids),
@@ -186,7 +221,8 @@ class MovieIDCollector:
         
         logger.info(f"Saved {len(movie_ids)} movie IDs to {filename}")
     
-    def save_ids_for_scrapper(self, movie_ids, filename="movie_ids_for_scrapper.py"):
+    @staticmethod
+    def save_ids_for_scrapper(movie_ids, filename=data_path("movie_ids_for_scrapper.py")):
         """Save movie IDs in Python format for the scrapper"""
         content = f"""# Auto-generated movie IDs for TMDB scrapper
 # Generated on 2025-09-26
@@ -197,9 +233,6 @@ MOVIE_IDS = {movie_ids}
 # Split into batches of 50 for processing
 BATCH_SIZE = 50
 MOVIE_BATCHES = [MOVIE_IDS[i:i+BATCH_SIZE] for i in range(0, len(MOVIE_IDS), BATCH_SIZE)]
-
-print(f"Total movies: {{len(MOVIE_IDS)}}")
-print(f"Total batches: {{len(MOVIE_BATCHES)}}")
 """
         
         with open(filename, 'w', encoding='utf-8') as f:
@@ -207,22 +240,26 @@ print(f"Total batches: {{len(MOVIE_BATCHES)}}")
         
         logger.info(f"Saved movie IDs for scrapper to {filename}")
 
-def main():
+def main(target_count=500, registry=None, max_requests=None):
     """Main execution function"""
-    collector = MovieIDCollector()
+    collector = MovieIDCollector(registry=registry or MovieRegistry())
     
-    logger.info("Starting to collect 500 movie IDs from TMDB...")
+    logger.info(f"Starting to collect {target_count} movie IDs from TMDB...")
     
     # Collect movie IDs
-    movie_ids, movie_details = collector.collect_movie_ids(target_count=500)
+    movie_ids, movie_details = collector.collect_movie_ids(target_count=target_count, max_requests=max_requests)
     
     logger.info(f"✓ Collected {len(movie_ids)} unique movie IDs")
     
+    # Keep the movies found by earlier runs in the output files
+    all_ids, all_details = collector.merge_with_saved(movie_ids, movie_details)
+    logger.info(f"✓ {len(all_ids)} movie IDs in total with earlier runs")
+    
     # Save to JSON file
-    collector.save_movie_ids(movie_ids, movie_details)
+    collector.save_movie_ids(all_ids, all_details)
     
     # Save for scrapper usage
-    collector.save_ids_for_scrapper(movie_ids)
+    collector.save_ids_for_scrapper(all_ids)
     
     # Display some statistics
     sources = {}
@@ -236,8 +273,9 @@ def main():
     
     logger.info("✓ Movie ID collection completed successfully")
     
-    return movie_ids
+    return all_ids
 
 if __name__ == "__main__":
+    setup()
     movie_ids = main()
     print(f"\nFirst 20 movie IDs: {movie_ids[:20]}")
\ No newline at end of file
@@ -0,0 +1,297 @@
+import json
+import os
+import logging
+
+import numpy as np
+
+import snapshot
+from config import data_path
+
+logger = logging.getLogger(__name__)
+
+# Link tables that connect movies to people, with the role each one stands for.
+# TMDB person IDs are shared by cast and crew, so one person can appear in several.
+LINK_TABLES = [
+    ('acted_in', 'actor_id', 'actor', 'name'),
+    ('movie_director', 'director_id', 'director', 'full_name'),
+    ('movie_writer', 'writer_id', 'writer', 'full_name'),
+]
+ROLES = [role for _, _, role, _ in LINK_TABLES]
+
+# Collector output files holding TMDB popularity (not stored in the movie table)
+POPULARITY_FILES = [data_path('movie_ids_500.json'), data_path('brazilian_movies_100.json')]
+
+MOVIE_STATS_DDL = """
+CREATE TABLE IF NOT EXISTS movies_data.movie_stats (
+    movie_id INT PRIMARY KEY,
+    degree INT NOT NULL,
+    neighbor_movies INT NOT NULL,
+    component_size INT NOT NULL,
+    difficulty NUMERIC(4, 3) NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    CONSTRAINT fk_movie_id FOREIGN KEY (movie_id) REFERENCES movies_data.movie(movie_id) ON DELETE CASCADE
+)
+"""
+
+def _csr(src, dst, n_src):
+    """Compressed sparse row adjacency: neighbours of node i are dst[indptr[i]:indptr[i+1]]"""
+    order = np.argsort(src, kind='stable')
+    indptr = np.zeros(n_src + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n_src), out=indptr[1:])
+    return indptr, dst[order], order
+
+def _expand(indptr, indices, nodes):
+    """Neighbours of many nodes at once
+
+    Returns the neighbours and, for each one, the position in `nodes` of the
+    node it came from.
+    """
+    starts = indptr[nodes]
+    lengths = indptr[nodes + 1] - starts
+    total = int(lengths.sum())
+    offsets = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return indices[np.repeat(starts, lengths) + offsets], np.repeat(np.arange(len(nodes)), lengths)
+
+def _percentile_rank(values):
+    """Rank values into [0, 1] (ties share the lower rank)"""
+    if len(values) < 2:
+        return np.zeros(len(values))
+    sorted_values = np.sort(values)
+    return np.searchsorted(sorted_values, values, side='left') / (len(values) - 1)
+
+def load_popularity(paths=POPULARITY_FILES):
+    """Read TMDB popularity per movie ID from the collectors' JSON files"""
+    popularity = {}
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        with open(path, encoding='utf-8') as f:
+            for detail in json.load(f).get('movie_details', []):
+                popularity[detail['id']] = detail.get('popularity', 0)
+    return popularity
+
+class MovieGraph:
+    """Bipartite movie-person graph stored as two CSR adjacency arrays.
+
+    Movies and people are renumbered to dense indices (sorted TMDB IDs), so
+    traversals work on integer arrays instead of SQL joins.
+    """
+    def __init__(self, movie_ids, edge_movies, edge_people, edge_roles, titles=None, people_names=None, ratings=None):
+        edge_movies = np.asarray(edge_movies, dtype=np.int64)
+        edge_people = np.asarray(edge_people, dtype=np.int64)
+
+        self.movie_ids = np.union1d(np.asarray(movie_ids, dtype=np.int64), edge_movies)
+        self.person_ids = np.unique(edge_people)
+        self.titles = titles or {}
+        self.people_names = people_names or {}
+        self.ratings = ratings or {}
+
+        self.edge_movie = np.searchsorted(self.movie_ids, edge_movies)
+        self.edge_person = np.searchsorted(self.person_ids, edge_people)
+        edge_roles = np.asarray(edge_roles, dtype=np.int8)
+
+        self.movie_indptr, self.movie_people, order = _csr(self.edge_movie, self.edge_person, len(self.movie_ids))
+        self.movie_roles = edge_roles[order]
+        self.person_indptr, self.person_movies, order = _csr(self.edge_person, self.edge_movie, len(self.person_ids))
+        self.person_roles = edge_roles[order]
+
+        logger.info(f"Graph built: {len(self.movie_ids)} movies, {len(self.person_ids)} people, {len(edge_movies)} links")
+
+    @classmethod
+    def from_snapshot(cls, snapshot_dir=snapshot.DEFAULT_SNAPSHOT_DIR):
+        """Build the graph from a snapshot written by `cli.py export snapshot`"""
+        tables = snapshot.load_snapshot(snapshot_dir, ['movie'] + [t for t, _, _, _ in LINK_TABLES] + ROLES)
+        movie = tables['movie']
+        movie_ids = movie.column('movie_id').to_numpy()
+        titles = dict(zip(movie_ids.tolist(), movie.column('title').to_pylist()))
+        ratings = dict(zip(movie_ids.tolist(), movie.column('rating').to_pylist()))
+
+        edge_movies, edge_people, edge_roles = [], [], []
+        people_names = {}
+        for role_index, (link_table, key, role, name_column) in enumerate(LINK_TABLES):
+            links = tables[link_table]
+            edge_movies.append(links.column('movie_id').to_numpy())
+            edge_people.append(links.column(key).to_numpy())
+            edge_roles.append(np.full(links.num_rows, role_index, dtype=np.int8))
+
+            people = tables[role]
+            people_names.update(zip(people.column(key).to_pylist(), people.column(name_column).to_pylist()))
+
+        return cls(
+            movie_ids,
+            np.concatenate(edge_movies),
+            np.concatenate(edge_people),
+            np.concatenate(edge_roles),
+            titles=titles,
+            people_names=people_names,
+            ratings=ratings,
+        )
+
+    def movie_index(self, movie_id):
+        i = int(np.searchsorted(self.movie_ids, movie_id))
+        if i >= len(self.movie_ids) or self.movie_ids[i] != movie_id:
+            raise KeyError(f"Movie {movie_id} is not in the graph")
+        return i
+
+    def movie_degree(self):
+        """Number of people linked to each movie"""
+        return np.diff(self.movie_indptr)
+
+    def person_degree(self):
+        """Number of movies linked to each person"""
+        return np.diff(self.person_indptr)
+
+    def shortest_path(self, from_movie, to_movie):
+        """Shortest movie -> person -> movie chain between two movies
+
+        Returns alternating TMDB IDs [movie, person, movie, ..., movie], or None
+        when the movies are not connected. Each BFS level is expanded for the
+        whole frontier at once.
+        """
+        source, target = self.movie_index(from_movie), self.movie_index(to_movie)
+        if source == target:
+            return [from_movie]
+
+        movie_parent = np.full(len(self.movie_ids), -1, dtype=np.int64)
+        person_parent = np.full(len(self.person_ids), -1, dtype=np.int64)
+        seen_movies = np.zeros(len(self.movie_ids), dtype=bool)
+        seen_people = np.zeros(len(self.person_ids), dtype=bool)
+        seen_movies[source] = True
+        frontier = np.array([source], dtype=np.int64)
+
+        while frontier.size and not seen_movies[target]:
+            people, origin = _expand(self.movie_indptr, self.movie_people, frontier)
+            new = ~seen_people[people]
+            people, first = np.unique(people[new], return_index=True)
+            seen_people[people] = True
+            person_parent[people] = frontier[origin[new][first]]
+
+            movies, origin = _expand(self.person_indptr, self.person_movies, people)
+            new = ~seen_movies[movies]
+            movies, first = np.unique(movies[new], return_index=True)
+            seen_movies[movies] = True
+            movie_parent[movies] = people[origin[new][first]]
+            frontier = movies
+
+        if not seen_movies[target]:
+            return None
+
+        path = [int(self.movie_ids[target])]
+        movie = target
+        while movie != source:
+            person = movie_parent[movie]
+            movie = person_parent[person]
+            path += [int(self.person_ids[person]), int(self.movie_ids[movie])]
+        return path[::-1]
+
+    def role_in(self, movie_id, person_id):
+        """Role (actor/director/writer) a person had in a movie, or None"""
+        i = self.movie_index(movie_id)
+        start, end = self.movie_indptr[i], self.movie_indptr[i + 1]
+        person = np.searchsorted(self.person_ids, person_id)
+        matches = np.nonzero(self.movie_people[start:end] == person)[0]
+        return ROLES[self.movie_roles[start + matches[0]]] if len(matches) else None
+
+    def describe_path(self, path):
+        """Render a shortest_path result as a readable hint"""
+        parts = [self.titles.get(path[0], str(path[0]))]
+        for i in range(1, len(path), 2):
+            previous_movie, person, movie = path[i - 1], path[i], path[i + 1]
+            role = self.role_in(previous_movie, person)
+            parts.append(f"via {role} {self.people_names.get(person, person)}")
+            parts.append(self.titles.get(movie, str(movie)))
+        return " -> ".join(parts)
+
+    def neighbor_counts(self, chunk_size=1024):
+        """Number of distinct other movies sharing at least one person with each movie
+
+        Processed in chunks of movies so the movie -> person -> movie expansion
+        stays bounded in memory.
+        """
+        n_movies = len(self.movie_ids)
+        counts = np.zeros(n_movies, dtype=np.int64)
+        for start in range(0, n_movies, chunk_size):
+            chunk = np.arange(start, min(start + chunk_size, n_movies))
+            people, origin = _expand(self.movie_indptr, self.movie_people, chunk)
+            movies, person_pos = _expand(self.person_indptr, self.person_movies, people)
+            owners = chunk[origin[person_pos]]
+
+            keep = owners != movies
+            pairs = np.unique(owners[keep] * n_movies + movies[keep])
+            counts += np.bincount(pairs // n_movies, minlength=n_movies)
+        return counts
+
+    def component_labels(self):
+        """Connected component label of each movie (min-label propagation)"""
+        labels = np.arange(len(self.movie_ids))
+        while True:
+            person_labels = np.full(len(self.person_ids), len(self.movie_ids))
+            np.minimum.at(person_labels, self.edge_person, labels[self.edge_movie])
+            new_labels = labels.copy()
+            np.minimum.at(new_labels, self.edge_movie, person_labels[self.edge_person])
+            if np.array_equal(new_labels, labels):
+                return labels
+            labels = new_labels
+
+    def component_sizes(self):
+        """Size of the connected component each movie belongs to"""
+        labels = self.component_labels()
+        return np.bincount(labels, minlength=len(self.movie_ids))[labels]
+
+    def _aligned(self, values_by_id):
+        return np.array([values_by_id.get(int(movie_id), 0) or 0 for movie_id in self.movie_ids], dtype=np.float64)
+
+    def difficulty_scores(self, popularity=None, ratings=None, weights=(0.45, 0.35, 0.2)):
+        """Difficulty in [0, 1] per movie: 1 - weighted guessability
+
+        Guessability combines TMDB popularity rank, connectivity rank (distinct
+        co-movies) and vote average. popularity and ratings map movie ID -> value;
+        ratings default to the movie.rating values the graph was built with.
+        """
+        if ratings is None:
+            ratings = self.ratings
+        popularity_rank = _percentile_rank(self._aligned(popularity or {}))
+        connectivity_rank = _percentile_rank(np.log1p(self.neighbor_counts()))
+        rating = np.clip(self._aligned(ratings) / 10, 0, 1)
+
+        w_popularity, w_connectivity, w_rating = weights
+        guessability = w_popularity * popularity_rank + w_connectivity * connectivity_rank + w_rating * rating
+        return np.clip(1 - guessability / sum(weights), 0, 1)
+
+    def movie_stats(self, popularity=None):
+        """Per-movie rows (movie_id, degree, neighbor_movies, component_size, difficulty)"""
+        columns = (
+            self.movie_ids,
+            self.movie_degree(),
+            self.neighbor_counts(),
+            self.component_sizes(),
+            np.round(self.difficulty_scores(popularity), 3),
+        )
+        return [(int(m), int(d), int(n), int(c), float(s)) for m, d, n, c, s in zip(*columns)]
+
+def write_movie_stats(rows, page_size=1000):
+    """Upsert movie_stats rows for the app to read"""
+    import db
+    from psycopg2.extras import execute_values
+
+    connection = db.connect(dict_rows=False)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(MOVIE_STATS_DDL)
+            execute_values(cursor, """
+                INSERT INTO movies_data.movie_stats (movie_id, degree, neighbor_movies, component_size, difficulty)
+                VALUES %s
+                ON CONFLICT (movie_id) DO UPDATE SET
+                    degree = EXCLUDED.degree,
+                    neighbor_movies = EXCLUDED.neighbor_movies,
+                    component_size = EXCLUDED.component_size,
+                    difficulty = EXCLUDED.difficulty,
+                    updated_at = NOW()
+            """, rows, page_size=page_size)
+        connection.commit()
+        logger.info(f"✓ Wrote stats for {len(rows)} movies")
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
@@ -7,6 +7,3 @@ MOVIE_IDS = [253952, 1382406, 198663, 11, 12, 13, 2062, 18, 22, 1284120, 1083420
 # Split into batches of 50 for processing
 BATCH_SIZE = 50
 MOVIE_BATCHES = [MOVIE_IDS[i:i+BATCH_SIZE] for i in range(0, len(MOVIE_IDS), BATCH_SIZE)]
-
-print(f"Total movies: {len(MOVIE_IDS)}")
-print(f"Total batches: {len(MOVIE_BATCHES)}")
@@ -0,0 +1,119 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+# TMDB never serves pages past 500, whatever total_pages says
+TMDB_MAX_PAGES = 500
+
+class PagedStrategy:
+    """One paginated TMDB listing (an endpoint, sort order or search term)"""
+    def __init__(self, name, fetch, max_pages=25, start_page=1):
+        self.name = name
+        self.fetch = fetch
+        self.max_pages = max_pages
+        self.start_page = start_page
+        self.total_pages = None
+        self.total_results = None
+        self.pages_fetched = 0
+        self.new_ids = 0
+        self.failures = 0
+        self.score = None
+        self.exhausted = False
+
+    @property
+    def next_page(self):
+        return self.start_page + self.pages_fetched
+
+    @property
+    def last_fetched(self):
+        return self.next_page - 1
+
+    @property
+    def last_page(self):
+        known = self.total_pages if self.total_pages is not None else self.max_pages
+        return min(known, self.max_pages, TMDB_MAX_PAGES)
+
+    def resume_after(self, last_page, total_pages=None):
+        """Continue after the last page an earlier run fetched
+
+        Earlier pages were already harvested and would only score zero, so
+        they are skipped. Once the listing was paged to its end the strategy
+        starts over from page 1, where new releases show up.
+        """
+        end = min(total_pages or self.max_pages, self.max_pages, TMDB_MAX_PAGES)
+        self.start_page = last_page + 1 if 0 < last_page < end else 1
+
+class PaginationPlanner:
+    """Spend a request budget on the strategies that still return new IDs.
+
+    Each strategy's marginal yield (new IDs / results on a page) is tracked as
+    an exponential moving average. The next page always comes from the
+    strategy with the best yield; untried strategies start at the best
+    possible yield so each one gets probed once it can compete. A strategy
+    stops when it reaches total_pages from its first response, returns an
+    empty page, or its yield falls below min_yield after min_pages pages.
+    A failed request (no response) counts against the budget and the page is
+    retried; only max_failures failures in a row stop the strategy.
+    """
+    def __init__(self, strategies, max_requests=None, min_yield=0.1, min_pages=2, smoothing=0.5, max_failures=3):
+        self.strategies = list(strategies)
+        self.max_requests = max_requests
+        self.min_yield = min_yield
+        self.min_pages = min_pages
+        self.smoothing = smoothing
+        self.max_failures = max_failures
+        self.requests = 0
+
+    def _active(self):
+        return [s for s in self.strategies if not s.exhausted and s.next_page <= s.last_page]
+
+    def next_page(self):
+        """Pick (strategy, page) to fetch next, or None when nothing is worth fetching"""
+        if self.max_requests is not None and self.requests >= self.max_requests:
+            return None
+
+        active = self._active()
+        if not active:
+            return None
+
+        # max() keeps the first of equal scores, so ties follow the strategy order
+        strategy = max(active, key=lambda s: 1.0 if s.score is None else s.score)
+        return strategy, strategy.next_page
+
+    def record(self, strategy, data, new_ids):
+        """Report a fetched page (None if the request failed) and how many previously unseen IDs it produced"""
+        self.requests += 1
+        if data is None:
+            strategy.failures += 1
+            if strategy.failures >= self.max_failures:
+                logger.warning(f"Dropping {strategy.name}: {strategy.failures} failed requests in a row")
+                strategy.exhausted = True
+            return
+
+        strategy.failures = 0
+        strategy.pages_fetched += 1
+        if strategy.total_pages is None:
+            strategy.total_pages = data.get('total_pages')
+            strategy.total_results = data.get('total_results')
+
+        results = data.get('results') or []
+        if not results:
+            strategy.exhausted = True
+            return
+
+        page_yield = new_ids / len(results)
+        strategy.new_ids += new_ids
+        if strategy.score is None:
+            strategy.score = page_yield
+        else:
+            strategy.score = self.smoothing * page_yield + (1 - self.smoothing) * strategy.score
+
+        if strategy.pages_fetched >= self.min_pages and strategy.score < self.min_yield:
+            logger.info(f"Dropping {strategy.name}: yield {strategy.score:.2f} after {strategy.pages_fetched} pages")
+            strategy.exhausted = True
+
+    def log_summary(self):
+        for s in self.strategies:
+            if s.pages_fetched:
+                logger.info(f"  {s.name}: {s.pages_fetched}/{s.last_page} pages, {s.new_ids} new movies")
+        logger.info(f"Pagination used {self.requests} list requests")
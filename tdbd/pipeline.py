@@ -0,0 +1,128 @@
+import queue
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of the stream on a queue
+_DONE = object()
+
+class Stage:
+    """One step of a pipeline: `func` is called for every item from the previous stage.
+
+    `func` returns the item for the next stage, or None to drop it. With
+    `batch_size` set, the stage receives lists of up to `batch_size` items and
+    returns the list of items that succeeded.
+    """
+    def __init__(self, name, func, workers=1, batch_size=None):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.batch_size = batch_size
+        self.processed = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._running = workers
+
+    def _count(self, result, size):
+        if result is None:
+            done = 0
+        else:
+            done = len(result) if self.batch_size else 1
+        with self._lock:
+            self.processed += done
+            self.dropped += size - done
+
+    def _call(self, item, size):
+        try:
+            result = self.func(item)
+        except Exception as e:
+            logger.error(f"Stage {self.name} failed: {e}")
+            result = None
+        self._count(result, size)
+        return result
+
+    def _finish(self, out_q, next_workers):
+        """Called by each worker on exit; the last one closes the output queue"""
+        with self._lock:
+            self._running -= 1
+            last = self._running == 0
+        if last and out_q is not None:
+            for _ in range(next_workers):
+                out_q.put(_DONE)
+
+    def _run(self, in_q, out_q, next_workers):
+        batch = []
+        while True:
+            item = in_q.get()
+            if item is _DONE:
+                break
+
+            if self.batch_size:
+                batch.append(item)
+                if len(batch) < self.batch_size:
+                    continue
+                item, batch = batch, []
+
+            result = self._call(item, len(item) if self.batch_size else 1)
+            if result is not None and out_q is not None:
+                out_q.put(result)
+
+        if batch:
+            result = self._call(batch, len(batch))
+            if result is not None and out_q is not None:
+                out_q.put(result)
+
+        self._finish(out_q, next_workers)
+
+class Pipeline:
+    """Run stages in threads connected by bounded queues.
+
+    Each queue holds at most `queue_size` items, so a slow stage blocks the
+    stages before it instead of letting work pile up in memory. The source is
+    consumed lazily, so memory use does not depend on how many items it yields.
+    """
+    def __init__(self, stages, queue_size=8):
+        self.stages = stages
+        self.queue_size = queue_size
+
+    def _feed(self, source, out_q, workers):
+        try:
+            for item in source:
+                out_q.put(item)
+        except Exception as e:
+            logger.error(f"Pipeline source failed: {e}")
+        finally:
+            for _ in range(workers):
+                out_q.put(_DONE)
+
+    def run(self, source):
+        """Push every item of `source` through the stages and wait for completion"""
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        threads = [threading.Thread(
+            target=self._feed,
+            args=(source, queues[0], self.stages[0].workers),
+            name="pipeline-source",
+            daemon=True,
+        )]
+
+        for i, stage in enumerate(self.stages):
+            is_last = i == len(self.stages) - 1
+            out_q = None if is_last else queues[i + 1]
+            next_workers = 0 if is_last else self.stages[i + 1].workers
+            for n in range(stage.workers):
+                threads.append(threading.Thread(
+                    target=stage._run,
+                    args=(queues[i], out_q, next_workers),
+                    name=f"pipeline-{stage.name}-{n}",
+                    daemon=True,
+                ))
+
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for stage in self.stages:
+            logger.info(f"Stage {stage.name}: {stage.processed} processed, {stage.dropped} dropped")
+        return self.stages
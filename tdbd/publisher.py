@@ -0,0 +1,187 @@
+import gzip
+import hashlib
+import json
+import os
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+
+import snapshot
+
+logger = logging.getLogger(__name__)
+
+# Next.js serves everything under app/public as static files
+DEFAULT_OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app', 'public', 'daily')
+
+TOP_ACTORS = 5
+
+def _encode(data):
+    """Canonical JSON bytes, so identical content always gets the same hash"""
+    return json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(',', ':'), default=str).encode('utf-8')
+
+def _write_atomic(path, content):
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+def write_variants(out_dir, name, data, immutable=True):
+    """Write data as JSON plus .gz and .br variants; returns the file name
+
+    Immutable files get a content hash in their name and are never rewritten,
+    so they can be served with a far-future cache header.
+    """
+    content = _encode(data)
+    if immutable:
+        name = f"{name}.{hashlib.sha256(content).hexdigest()[:16]}"
+    filename = f"{name}.json"
+    path = os.path.join(out_dir, filename)
+    if immutable and os.path.exists(path):
+        return filename
+
+    # Written before the plain file, which marks the set as complete
+    _write_atomic(path + '.gz', gzip.compress(content, compresslevel=9, mtime=0))
+    try:
+        import brotli
+        _write_atomic(path + '.br', brotli.compress(content, quality=11))
+    except ImportError:
+        logger.debug("brotli not installed, skipping .br variant")
+    _write_atomic(path, content)
+    return filename
+
+class PuzzleBuilder:
+    """Build daily puzzle documents from snapshot tables"""
+    def __init__(self, tables):
+        self.movies = {row['movie_id']: row for row in tables['movie'].to_pylist()}
+        self.producers = {row['producer_id']: row['company_name'] for row in tables['producer'].to_pylist()}
+
+        genre_names = {row['genre_id']: row['genre_name'] for row in tables['genre'].to_pylist()}
+        self.genres = self._group(tables['movie_genre'], 'genre_id', genre_names)
+        self.actors = self._group(tables['acted_in'], 'actor_id', self._names(tables['actor'], 'actor_id', 'name'))
+        self.directors = self._group(tables['movie_director'], 'director_id',
+                                     self._names(tables['director'], 'director_id', 'full_name'))
+        self.writers = self._group(tables['movie_writer'], 'writer_id',
+                                   self._names(tables['writer'], 'writer_id', 'full_name'))
+
+    @staticmethod
+    def _names(table, key, column):
+        return dict(zip(table.column(key).to_pylist(), table.column(column).to_pylist()))
+
+    @staticmethod
+    def _group(links, key, names):
+        grouped = defaultdict(list)
+        for movie_id, other_id in zip(links.column('movie_id').to_pylist(), links.column(key).to_pylist()):
+            if other_id in names:
+                grouped[movie_id].append(names[other_id])
+        return grouped
+
+    def titles(self):
+        """Every guessable title, sorted for display"""
+        return sorted(
+            ({'id': movie_id, 'title': movie['title'],
+              'year': movie['release_date'].year if movie['release_date'] else None}
+             for movie_id, movie in self.movies.items() if not movie['adult']),
+            key=lambda item: (item['title'].casefold(), item['id'])
+        )
+
+    def puzzle(self, day, movie_id):
+        """Movie card and hint tiers for one day"""
+        movie = self.movies[movie_id]
+        release = movie['release_date']
+        genres = self.genres.get(movie_id, [])
+        directors = self.directors.get(movie_id, [])
+        actors = self.actors.get(movie_id, [])[:TOP_ACTORS]
+
+        return {
+            'date': day.isoformat(),
+            'movie_id': movie_id,
+            'hints': [
+                {'tier': 1, 'genres': genres, 'decade': f"{release.year // 10 * 10}s" if release else None},
+                {'tier': 2, 'year': release.year if release else None, 'duration_minutes': movie['duration_minutes'],
+                 'directors': directors, 'producer': self.producers.get(movie['producer_id'])},
+                {'tier': 3, 'actors': actors, 'tagline': movie['tagline'] or None},
+                {'tier': 4, 'synopsis': movie['synopsis'] or None},
+            ],
+            'card': {
+                'title': movie['title'],
+                'release_date': release,
+                # Stored as float32 in the snapshot
+                'rating': round(movie['rating'], 1) if movie['rating'] is not None else None,
+                'duration_minutes': movie['duration_minutes'],
+                'tagline': movie['tagline'] or None,
+                'overview': movie['overview'] or None,
+                'genres': genres,
+                'directors': directors,
+                'writers': self.writers.get(movie_id, []),
+                'actors': actors,
+                'producer': self.producers.get(movie['producer_id']),
+            },
+        }
+
+def load_schedule(start, days):
+    """Read today_movie rows for [start, start + days) from the database"""
+    import db
+
+    connection = db.connect(dict_rows=False)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT today_date, movie_id FROM movies_data.today_movie "
+                "WHERE today_date >= %s AND today_date < %s ORDER BY today_date",
+                (start, start + timedelta(days=days))
+            )
+            return cursor.fetchall()
+    finally:
+        connection.close()
+
+def publish(schedule, snapshot_dir=snapshot.DEFAULT_SNAPSHOT_DIR, out_dir=DEFAULT_OUTPUT_DIR, until=None):
+    """Render scheduled days up to `until` (default: today) as static, precompressed JSON files
+
+    Puzzle files contain the answer and everything under app/public can be
+    downloaded, so later days are skipped until their own day.
+
+    Layout of out_dir:
+        titles.<hash>.json          guessable titles, shared by every day
+        puzzles/<date>.<hash>.json  one puzzle per scheduled day
+        index.json                  date -> puzzle file, plus the titles file
+    """
+    builder = PuzzleBuilder(snapshot.load_snapshot(snapshot_dir, [
+        'movie', 'genre', 'movie_genre', 'actor', 'acted_in', 'director', 'movie_director',
+        'writer', 'movie_writer', 'producer',
+    ]))
+    os.makedirs(os.path.join(out_dir, 'puzzles'), exist_ok=True)
+
+    titles_file = write_variants(out_dir, 'titles', builder.titles())
+    index_path = os.path.join(out_dir, 'index.json')
+    index = {'days': {}}
+    if os.path.exists(index_path):
+        with open(index_path, encoding='utf-8') as f:
+            index = json.load(f)
+
+    until = until or date.today()
+    published = 0
+    for day, movie_id in schedule:
+        if day > until:
+            logger.warning(f"Not publishing {day} before its day")
+            continue
+        if movie_id not in builder.movies:
+            logger.error(f"✗ Movie {movie_id} scheduled on {day} is not in the snapshot")
+            continue
+        puzzle_file = write_variants(os.path.join(out_dir, 'puzzles'), day.isoformat(), builder.puzzle(day, movie_id))
+        index['days'][day.isoformat()] = f"puzzles/{puzzle_file}"
+        published += 1
+
+    index['titles'] = titles_file
+    index['generated_at'] = datetime.now(timezone.utc).isoformat(timespec='seconds')
+    write_variants(out_dir, 'index', index, immutable=False)
+
+    logger.info(f"✓ Published {published} days to {out_dir}")
+    return index
+
+def run(days=1, start=None, snapshot_dir=snapshot.DEFAULT_SNAPSHOT_DIR, out_dir=DEFAULT_OUTPUT_DIR):
+    """Publish the scheduled puzzles for `days` days from `start` (default: today only)
+
+    Days after today are never published, see publish().
+    """
+    start = start or date.today()
+    return publish(load_schedule(start, days), snapshot_dir, out_dir)
@@ -0,0 +1,249 @@
+import hashlib
+import math
+import os
+import sqlite3
+import threading
+import logging
+from datetime import datetime, timezone
+
+from config import data_path
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REGISTRY_PATH = data_path('movie_registry.sqlite3')
+
+class BloomFilter:
+    """Fixed-size Bloom filter over integer keys (no false negatives)"""
+    def __init__(self, capacity=100000, error_rate=0.01):
+        self.capacity = capacity
+        self.size = math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(str(key).encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+class MovieRegistry:
+    """Persistent registry of every movie ID seen by the collectors and the scrapper.
+
+    Each ID is stored once in SQLite with the collector and strategy that
+    found it first, and the time it was ingested. Every collector that found
+    it is kept in movie_source, so a Brazilian title first seen by the
+    popular collector still counts as Brazilian. Verification results
+    (e.g. "is this movie Brazilian?") are kept in movie_check, including
+    rejections, so no movie is verified against TMDB twice. Lookups go through a Bloom
+    filter first, so IDs that were never seen (the common case while paging
+    through TMDB) are answered without touching SQLite.
+    """
+    def __init__(self, path=None):
+        self.path = path or os.getenv('MOVIE_REGISTRY_PATH', DEFAULT_REGISTRY_PATH)
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS seen_movie (
+                movie_id INTEGER PRIMARY KEY,
+                collector TEXT NOT NULL,
+                strategy TEXT,
+                first_seen TEXT NOT NULL,
+                ingested_at TEXT
+            )
+        """)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS movie_source (
+                movie_id INTEGER NOT NULL,
+                collector TEXT NOT NULL,
+                strategy TEXT,
+                first_seen TEXT NOT NULL,
+                PRIMARY KEY (movie_id, collector)
+            )
+        """)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS strategy_progress (
+                collector TEXT NOT NULL,
+                strategy TEXT NOT NULL,
+                last_page INTEGER NOT NULL,
+                total_pages INTEGER,
+                updated_at TEXT NOT NULL,
+                PRIMARY KEY (collector, strategy)
+            )
+        """)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS movie_check (
+                movie_id INTEGER NOT NULL,
+                check_name TEXT NOT NULL,
+                passed INTEGER NOT NULL,
+                checked_at TEXT NOT NULL,
+                PRIMARY KEY (movie_id, check_name)
+            )
+        """)
+        # Registries created before movie_source only know the first collector
+        self.connection.execute("""
+            INSERT OR IGNORE INTO movie_source (movie_id, collector, strategy, first_seen)
+            SELECT movie_id, collector, strategy, first_seen FROM seen_movie
+        """)
+        # ...and before movie_check, only confirmed Brazilian movies were stored
+        self.connection.execute("""
+            INSERT OR IGNORE INTO movie_check (movie_id, check_name, passed, checked_at)
+            SELECT movie_id, 'brazilian', 1, first_seen FROM movie_source WHERE collector = 'brazilian'
+        """)
+        self.connection.commit()
+        self._load_bloom()
+
+    def _load_bloom(self):
+        """Rebuild the Bloom filter from the stored IDs (seen or checked), leaving room to grow"""
+        ids = [movie_id for (movie_id,) in self.connection.execute(
+            "SELECT movie_id FROM seen_movie UNION SELECT movie_id FROM movie_check"
+        )]
+        self.bloom = BloomFilter(capacity=max(100000, len(ids) * 2))
+        for movie_id in ids:
+            self.bloom.add(movie_id)
+        logger.info(f"Loaded {len(ids)} known movie IDs from {self.path}")
+
+    def _now(self):
+        return datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+    def is_known(self, movie_id, collector=None):
+        """Check whether a movie ID was already collected or ingested (by a given collector)"""
+        if movie_id not in self.bloom:
+            return False
+        with self._lock:
+            if collector is None:
+                row = self.connection.execute(
+                    "SELECT 1 FROM seen_movie WHERE movie_id = ?", (movie_id,)
+                ).fetchone()
+            else:
+                row = self.connection.execute(
+                    "SELECT 1 FROM movie_source WHERE movie_id = ? AND collector = ?", (movie_id, collector)
+                ).fetchone()
+        return row is not None
+
+    def is_ingested(self, movie_id):
+        """Check whether a movie ID is already in the movie table"""
+        if movie_id not in self.bloom:
+            return False
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT 1 FROM seen_movie WHERE movie_id = ? AND ingested_at IS NOT NULL", (movie_id,)
+            ).fetchone()
+        return row is not None
+
+    def record(self, movie_id, collector, strategy=None):
+        """Record a movie ID found by a collector; returns False if that collector already knew it"""
+        now = self._now()
+        with self._lock:
+            cursor = self.connection.execute(
+                "INSERT OR IGNORE INTO seen_movie (movie_id, collector, strategy, first_seen) VALUES (?, ?, ?, ?)",
+                (movie_id, collector, strategy, now)
+            )
+            if cursor.rowcount:
+                self._add_to_bloom(movie_id)
+            cursor = self.connection.execute(
+                "INSERT OR IGNORE INTO movie_source (movie_id, collector, strategy, first_seen) VALUES (?, ?, ?, ?)",
+                (movie_id, collector, strategy, now)
+            )
+            self.connection.commit()
+        return cursor.rowcount > 0
+
+    def is_checked(self, movie_id, check_name):
+        """Check whether a movie was already verified (passed or not)"""
+        if movie_id not in self.bloom:
+            return False
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT 1 FROM movie_check WHERE movie_id = ? AND check_name = ?", (movie_id, check_name)
+            ).fetchone()
+        return row is not None
+
+    def record_check(self, movie_id, check_name, passed):
+        """Store the result of verifying a movie, e.g. record_check(id, 'brazilian', False)"""
+        with self._lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO movie_check (movie_id, check_name, passed, checked_at) VALUES (?, ?, ?, ?)",
+                (movie_id, check_name, int(passed), self._now())
+            )
+            self.connection.commit()
+            if movie_id not in self.bloom:
+                self._add_to_bloom(movie_id)
+
+    def mark_ingested(self, movie_ids, collector='scrapper'):
+        """Mark movie IDs as written to the movie table"""
+        now = self._now()
+        with self._lock:
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO seen_movie (movie_id, collector, first_seen) VALUES (?, ?, ?)",
+                [(movie_id, collector, now) for movie_id in movie_ids]
+            )
+            # Only IDs no collector has found get the ingesting side as their source
+            self.connection.executemany(
+                "INSERT INTO movie_source (movie_id, collector, first_seen) "
+                "SELECT ?, ?, ? WHERE NOT EXISTS (SELECT 1 FROM movie_source WHERE movie_id = ?)",
+                [(movie_id, collector, now, movie_id) for movie_id in movie_ids]
+            )
+            self.connection.executemany(
+                "UPDATE seen_movie SET ingested_at = ? WHERE movie_id = ?",
+                [(now, movie_id) for movie_id in movie_ids]
+            )
+            self.connection.commit()
+            for movie_id in movie_ids:
+                if movie_id not in self.bloom:
+                    self._add_to_bloom(movie_id)
+
+    def _add_to_bloom(self, movie_id):
+        # Past capacity the false positive rate climbs, so rebuild with more room
+        if self.bloom.count >= self.bloom.capacity:
+            self._load_bloom()
+        self.bloom.add(movie_id)
+
+    def ids_by_collector(self, collector):
+        """All movie IDs found by a given collector"""
+        with self._lock:
+            rows = self.connection.execute(
+                "SELECT movie_id FROM movie_source WHERE collector = ?", (collector,)
+            ).fetchall()
+        return {movie_id for (movie_id,) in rows}
+
+    def stats(self):
+        """Count known movie IDs per collector and how many are ingested
+
+        A movie found by several collectors is counted under each of them.
+        """
+        with self._lock:
+            return self.connection.execute("""
+                SELECT s.collector, COUNT(*), COUNT(m.ingested_at)
+                FROM movie_source s JOIN seen_movie m ON m.movie_id = s.movie_id
+                GROUP BY s.collector ORDER BY s.collector
+            """).fetchall()
+
+    def strategy_progress(self, collector, strategy):
+        """Last page fetched by a collector strategy and its total_pages, (0, None) if never run"""
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT last_page, total_pages FROM strategy_progress WHERE collector = ? AND strategy = ?",
+                (collector, strategy)
+            ).fetchone()
+        return row or (0, None)
+
+    def save_strategy_progress(self, collector, strategy, last_page, total_pages=None):
+        with self._lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO strategy_progress (collector, strategy, last_page, total_pages, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (collector, strategy, last_page, total_pages, self._now())
+            )
+            self.connection.commit()
+
+    def close(self):
+        self.connection.close()
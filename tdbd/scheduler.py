@@ -0,0 +1,202 @@
+import json
+import os
+import logging
+from datetime import date, timedelta
+
+import numpy as np
+
+import snapshot
+from config import data_path
+
+logger = logging.getLogger(__name__)
+
+BRAZILIAN_MOVIES_FILE = data_path('brazilian_movies_100.json')
+
+def weekly_curve(day):
+    """Target difficulty for a day: easiest on Monday, hardest on Sunday"""
+    return 0.25 + 0.5 * day.weekday() / 6
+
+def load_brazilian_ids(path=BRAZILIAN_MOVIES_FILE, registry=None):
+    """Movie IDs found by BrazilianMovieCollector (JSON output and registry)"""
+    brazilian_ids = set()
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            brazilian_ids.update(json.load(f).get('movie_ids', []))
+    if registry:
+        brazilian_ids.update(registry.ids_by_collector('brazilian'))
+    return brazilian_ids
+
+class DailyScheduler:
+    """Pick the movie of the day for a range of dates in one pass.
+
+    Every day scores all candidates at once with numpy: distance to the
+    difficulty curve, genres and decade shared with the last few picks, and
+    how far the schedule is from the Brazilian share. The cheapest candidate
+    wins, so each day costs one vectorized pass with no random retries.
+    Movies scheduled within repeat_window days (before or after) are never candidates.
+    """
+    def __init__(self, movie_ids, difficulty, genres, release_years, brazilian_ids=(), history=None,
+                 repeat_window=365, genre_window=3, decade_window=2, brazilian_share=0.2,
+                 curve=weekly_curve, seed=0):
+        self.movie_ids = np.asarray(movie_ids, dtype=np.int64)
+        self.difficulty = np.asarray(difficulty, dtype=np.float64)
+        self.history = dict(history or {})
+        self.repeat_window = repeat_window
+        self.genre_window = genre_window
+        self.decade_window = decade_window
+        self.brazilian_share = brazilian_share
+        self.curve = curve
+        self.rng = np.random.default_rng(seed)
+
+        # Movie x genre indicator matrix
+        genre_list = sorted({genre for movie_genres in genres for genre in movie_genres})
+        genre_index = {genre: i for i, genre in enumerate(genre_list)}
+        self.genre_matrix = np.zeros((len(self.movie_ids), len(genre_list)), dtype=np.float64)
+        for row, movie_genres in enumerate(genres):
+            for genre in movie_genres:
+                self.genre_matrix[row, genre_index[genre]] = 1
+
+        years = np.array([year if year else -10 for year in release_years], dtype=np.int64)
+        self.decades = years // 10
+        self.brazilian = np.isin(self.movie_ids, np.fromiter(brazilian_ids, dtype=np.int64))
+        self._row = {int(movie_id): row for row, movie_id in enumerate(self.movie_ids)}
+
+    @classmethod
+    def from_snapshot(cls, snapshot_dir=snapshot.DEFAULT_SNAPSHOT_DIR, difficulty=None, **kwargs):
+        """Build the candidate pool from a snapshot; difficulty maps movie ID -> score"""
+        tables = snapshot.load_snapshot(snapshot_dir, ['movie', 'movie_genre'])
+        movie = tables['movie']
+        adult = movie.column('adult').to_pylist()
+        movie_ids = [m for m, is_adult in zip(movie.column('movie_id').to_pylist(), adult) if not is_adult]
+        release_dates = dict(zip(movie.column('movie_id').to_pylist(), movie.column('release_date').to_pylist()))
+
+        genres = {movie_id: set() for movie_id in movie_ids}
+        links = tables['movie_genre']
+        for movie_id, genre_id in zip(links.column('movie_id').to_pylist(), links.column('genre_id').to_pylist()):
+            if movie_id in genres:
+                genres[movie_id].add(genre_id)
+
+        difficulty = difficulty or {}
+        return cls(
+            movie_ids,
+            [difficulty.get(movie_id, 0.5) for movie_id in movie_ids],
+            [genres[movie_id] for movie_id in movie_ids],
+            [release_dates[movie_id].year if release_dates[movie_id] else None for movie_id in movie_ids],
+            **kwargs,
+        )
+
+    def schedule(self, start, days):
+        """Return [(date, movie_id)] for `days` days from `start`, skipping dates already scheduled"""
+        history = dict(self.history)
+        picks = []
+
+        for offset in range(days):
+            day = start + timedelta(days=offset)
+            if day in history:
+                continue
+
+            # Scheduled days around this one (already decided rows and new picks)
+            recent = {d: m for d, m in history.items() if abs((day - d).days) <= self.repeat_window}
+            recent_rows = [self._row[m] for m in recent.values() if m in self._row]
+
+            available = np.ones(len(self.movie_ids), dtype=bool)
+            available[recent_rows] = False
+            if not available.any():
+                logger.warning(f"No movie left to schedule on {day} (repeat window {self.repeat_window} days)")
+                break
+
+            cost = np.abs(self.difficulty - self.curve(day))
+
+            genre_rows = self._rows_within(recent, day, self.genre_window)
+            if genre_rows:
+                recent_genres = self.genre_matrix[genre_rows].sum(axis=0)
+                cost += 0.3 * (self.genre_matrix @ recent_genres)
+
+            decade_rows = self._rows_within(recent, day, self.decade_window)
+            if decade_rows:
+                cost += 0.2 * np.isin(self.decades, self.decades[decade_rows])
+
+            cost += self._brazilian_cost(recent, day)
+            # Small jitter so equally good candidates don't always resolve the same way
+            cost += self.rng.random(len(cost)) * 1e-3
+            cost[~available] = np.inf
+
+            movie_id = int(self.movie_ids[np.argmin(cost)])
+            history[day] = movie_id
+            picks.append((day, movie_id))
+
+        logger.info(f"Scheduled {len(picks)} days starting {start}")
+        return picks
+
+    def _rows_within(self, recent, day, window):
+        return [self._row[m] for d, m in recent.items() if abs((day - d).days) <= window and m in self._row]
+
+    def _brazilian_cost(self, recent, day):
+        """Push Brazilian titles up or down to keep their share over the last 30 days"""
+        window = [m for d, m in recent.items() if 0 < (day - d).days <= 30]
+        brazilian_count = sum(self.brazilian[self._row[m]] for m in window if m in self._row)
+        target_count = self.brazilian_share * (len(window) + 1)
+        if brazilian_count < target_count - 0.5:
+            return np.where(self.brazilian, -0.5, 0.0)
+        if brazilian_count > target_count + 0.5:
+            return np.where(self.brazilian, 0.5, 0.0)
+        return 0.0
+
+def load_history(connection, since):
+    """Read already scheduled days (today_date -> movie_id) from today_movie"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT today_date, movie_id FROM movies_data.today_movie WHERE today_date >= %s",
+            (since,)
+        )
+        return {today_date: movie_id for today_date, movie_id in cursor.fetchall()}
+
+def write_schedule(connection, picks):
+    """Insert scheduled days; days decided meanwhile are left untouched"""
+    from psycopg2.extras import execute_values
+
+    with connection.cursor() as cursor:
+        execute_values(
+            cursor,
+            "INSERT INTO movies_data.today_movie (today_date, movie_id) VALUES %s ON CONFLICT (today_date) DO NOTHING",
+            picks
+        )
+    connection.commit()
+    logger.info(f"✓ Wrote {len(picks)} days to today_movie")
+
+def run(days=30, start=None, snapshot_dir=snapshot.DEFAULT_SNAPSHOT_DIR, brazilian_share=0.2,
+        repeat_window=365, dry_run=False):
+    """Schedule the next `days` days using snapshot data and the live today_movie table"""
+    import db
+    import movie_graph
+    from registry import MovieRegistry
+
+    start = start or date.today()
+    graph = movie_graph.MovieGraph.from_snapshot(snapshot_dir)
+    difficulty = dict(zip(graph.movie_ids.tolist(),
+                          graph.difficulty_scores(movie_graph.load_popularity()).tolist()))
+
+    registry = MovieRegistry()
+    try:
+        brazilian_ids = load_brazilian_ids(registry=registry)
+    finally:
+        registry.close()
+
+    connection = db.connect(dict_rows=False)
+    try:
+        history = load_history(connection, start - timedelta(days=repeat_window))
+        scheduler = DailyScheduler.from_snapshot(
+            snapshot_dir,
+            difficulty=difficulty,
+            brazilian_ids=brazilian_ids,
+            history=history,
+            repeat_window=repeat_window,
+            brazilian_share=brazilian_share,
+            seed=start.toordinal(),
+        )
+        picks = scheduler.schedule(start, days)
+        if not dry_run and picks:
+            write_schedule(connection, picks)
+    finally:
+        connection.close()
+    return picks
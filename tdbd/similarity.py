@@ -0,0 +1,354 @@
+import hashlib
+import os
+import re
+import unicodedata
+import logging
+from collections import Counter
+
+import numpy as np
+
+import snapshot
+from config import data_path
+from movie_graph import _csr, _expand
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDEX_PATH = data_path('similarity_index.parquet')
+
+# Rebuild everything (fresh IDF for all scores) once this share of the catalog
+# changed since the last full build
+FULL_REBUILD_SHARE = 0.2
+
+# Portuguese and English stop words, accent-folded like the tokens
+STOP_WORDS = frozenset("""
+a ao aos as ate com como da das de dela dele deles do dos e ela elas ele eles em entre era essa esse esta este
+eu foi ha isso isto ja la mais mas me mesmo muito na nao nas nem no nos num numa o os ou para pela pelas pelo
+pelos por quando que quem se sem ser seu seus sua suas sao tambem te tem ter um uma umas uns vai voce
+about after all also an and any are as at be been before but by can do for from had has have he her his how
+if in into is it its just more most not of on one or our out over she so some than that the their them then
+there they this through to up was we were what when where which while who will with would you your
+""".split())
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+MOVIE_SIMILARITY_DDL = """
+CREATE TABLE IF NOT EXISTS movies_data.movie_similarity (
+    movie_id INT NOT NULL,
+    rank SMALLINT NOT NULL,
+    similar_movie_id INT NOT NULL,
+    score NUMERIC(4, 3) NOT NULL,
+    PRIMARY KEY (movie_id, rank),
+    CONSTRAINT fk_movie_id FOREIGN KEY (movie_id) REFERENCES movies_data.movie(movie_id) ON DELETE CASCADE,
+    CONSTRAINT fk_similar_movie_id FOREIGN KEY (similar_movie_id) REFERENCES movies_data.movie(movie_id) ON DELETE CASCADE
+)
+"""
+
+def fold(text):
+    """Casefold and strip accents, so 'Ação' and 'acao' are the same token"""
+    decomposed = unicodedata.normalize('NFKD', text.casefold())
+    return ''.join(c for c in decomposed if not unicodedata.combining(c))
+
+def tokenize(text):
+    return [token for token in _TOKEN_RE.findall(fold(text or ''))
+            if len(token) > 2 and not token.isdigit() and token not in STOP_WORDS]
+
+def text_hash(text):
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=8).hexdigest()
+
+class TfidfMatrix:
+    """L2-normalized TF-IDF document-term matrix in CSR form, plus its transpose.
+
+    Row products are computed through the term -> documents postings, so
+    scoring a chunk of documents against the whole catalog only touches
+    documents that share a term with it. Terms in more than max_df of the
+    documents are dropped; they carry little signal and have the longest
+    postings.
+    """
+    def __init__(self, texts, min_df=2, max_df=0.5):
+        counts = [Counter(tokenize(text)) for text in texts]
+        n_docs = len(counts)
+
+        doc_freq = Counter(term for doc in counts for term in doc)
+        max_count = max(max_df * n_docs, min_df)
+        self.vocabulary = {term: i for i, term in enumerate(sorted(
+            term for term, df in doc_freq.items() if min_df <= df <= max_count
+        ))}
+        idf = np.array([np.log((1 + n_docs) / (1 + doc_freq[term])) + 1 for term in self.vocabulary], dtype=np.float32)
+
+        rows, terms, tf = [], [], []
+        for row, doc in enumerate(counts):
+            for term, count in doc.items():
+                if term in self.vocabulary:
+                    rows.append(row)
+                    terms.append(self.vocabulary[term])
+                    tf.append(count)
+        rows = np.asarray(rows, dtype=np.int64)
+        terms = np.asarray(terms, dtype=np.int64)
+        weights = (1 + np.log(np.asarray(tf, dtype=np.float32))) * idf[terms]
+
+        norms = np.sqrt(np.bincount(rows, weights=weights ** 2, minlength=n_docs))
+        weights = (weights / norms[rows]).astype(np.float32)
+
+        self.n_docs = n_docs
+        self.indptr, self.indices, order = _csr(rows, terms, n_docs)
+        self.data = weights[order]
+        self.term_indptr, self.term_docs, order = _csr(terms, rows, len(self.vocabulary))
+        self.term_weights = weights[order]
+
+    def scores(self, rows):
+        """Cosine similarity of the given documents to every document, as a dense (len(rows), n_docs) array"""
+        rows = np.asarray(rows, dtype=np.int64)
+        positions, origin = _expand(self.indptr, np.arange(len(self.indices)), rows)
+        postings, term_origin = _expand(self.term_indptr, np.arange(len(self.term_docs)), self.indices[positions])
+
+        owners = origin[term_origin]
+        weights = self.term_weights[postings] * self.data[positions][term_origin]
+        flat = np.bincount(owners * self.n_docs + self.term_docs[postings], weights=weights,
+                           minlength=len(rows) * self.n_docs)
+        return flat.reshape(len(rows), self.n_docs)
+
+    def top_k(self, rows, k=10, chunk_size=256):
+        """Yield (row, neighbour rows, scores) for each row, best first, self and zero scores excluded"""
+        rows = np.asarray(rows, dtype=np.int64)
+        k = min(k, self.n_docs - 1)
+        if k <= 0:
+            return
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            scores = self.scores(chunk)
+            scores[np.arange(len(chunk)), chunk] = 0
+
+            best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            best_scores = np.take_along_axis(scores, best, axis=1)
+            order = np.argsort(-best_scores, axis=1, kind='stable')
+            best = np.take_along_axis(best, order, axis=1)
+            best_scores = np.take_along_axis(best_scores, order, axis=1)
+
+            for row, neighbours, neighbour_scores in zip(chunk, best, best_scores):
+                keep = neighbour_scores > 0
+                yield int(row), neighbours[keep], neighbour_scores[keep]
+
+    def pair_scores(self, left, right):
+        """Cosine similarity of each (left[i], right[i]) pair of documents
+
+        The terms of both sides are keyed by (pair, term) and intersected, so
+        only the pairs' own rows are touched, not the postings.
+        """
+        left = np.asarray(left, dtype=np.int64)
+        right = np.asarray(right, dtype=np.int64)
+        n_terms = max(len(self.vocabulary), 1)
+        positions = np.arange(len(self.indices))
+        left_pos, left_pair = _expand(self.indptr, positions, left)
+        right_pos, right_pair = _expand(self.indptr, positions, right)
+        _, left_hit, right_hit = np.intersect1d(
+            left_pair * n_terms + self.indices[left_pos],
+            right_pair * n_terms + self.indices[right_pos],
+            assume_unique=True, return_indices=True,
+        )
+        weights = self.data[left_pos[left_hit]] * self.data[right_pos[right_hit]]
+        return np.bincount(left_pair[left_hit], weights=weights, minlength=len(left))
+
+def movie_texts(snapshot_dir=snapshot.DEFAULT_SNAPSHOT_DIR):
+    """(movie IDs, synopsis + tagline texts) of the non-adult movies in a snapshot"""
+    movie = snapshot.load_snapshot(snapshot_dir, ['movie'])['movie']
+    movie_ids, texts = [], []
+    for movie_id, synopsis, tagline, adult in zip(
+        movie.column('movie_id').to_pylist(),
+        movie.column('synopsis').to_pylist(),
+        movie.column('tagline').to_pylist(),
+        movie.column('adult').to_pylist(),
+    ):
+        if not adult:
+            movie_ids.append(movie_id)
+            texts.append(f"{synopsis or ''}\n{tagline or ''}")
+    return movie_ids, texts
+
+def load_index(path=DEFAULT_INDEX_PATH):
+    """Read a neighbour index as movie_id -> (text hash, neighbour IDs, scores)
+
+    Also returns its metadata ({'k', 'changed_since_full'}) and the IDs whose
+    current list is in movie_similarity.
+    """
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(path)
+    metadata = table.schema.metadata or {}
+    meta = {
+        'k': int(metadata.get(b'k', b'0')),
+        'changed_since_full': int(metadata.get(b'changed_since_full', b'0')),
+    }
+    index = {
+        movie_id: (hash_, neighbours, scores)
+        for movie_id, hash_, neighbours, scores in zip(
+            table.column('movie_id').to_pylist(),
+            table.column('text_hash').to_pylist(),
+            table.column('neighbor_ids').to_pylist(),
+            table.column('scores').to_pylist(),
+        )
+    }
+    written = set()
+    if 'written' in table.column_names:
+        written = {movie_id for movie_id, is_written in zip(table.column('movie_id').to_pylist(),
+                                                             table.column('written').to_pylist()) if is_written}
+    return index, meta, written
+
+def save_index(index, k, path=DEFAULT_INDEX_PATH, written=(), changed_since_full=0):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    movie_ids = sorted(index)
+    table = pa.table({
+        'movie_id': pa.array(movie_ids, type=pa.int32()),
+        'text_hash': pa.array([index[m][0] for m in movie_ids], type=pa.string()),
+        'neighbor_ids': pa.array([list(index[m][1]) for m in movie_ids], type=pa.list_(pa.int32())),
+        'scores': pa.array([list(index[m][2]) for m in movie_ids], type=pa.list_(pa.float32())),
+        'written': pa.array([m in written for m in movie_ids], type=pa.bool_()),
+    }).replace_schema_metadata({'k': str(k), 'changed_since_full': str(changed_since_full)})
+
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    pq.write_table(table, tmp_path, compression='zstd')
+    os.replace(tmp_path, path)
+
+def build_index(movie_ids, texts, previous=None, k=10, chunk_size=256, changed_since_full=0):
+    """Compute top-k neighbours, reusing `previous` for movies whose text did not change
+
+    Returns the new index, the IDs whose neighbours or scores changed and the
+    number of movies changed since the last full build. The TF-IDF matrix is
+    always rebuilt (it is cheap), but only new or changed movies, and
+    unchanged ones that lost a neighbour from a full list, are scored against
+    the whole catalog. Other unchanged movies rescore their kept neighbours
+    under the current IDF and merge them with the scores against the changed
+    movies, which come for free from the same products since cosine
+    similarity is symmetric. Neighbours an IDF shift would bring in from the
+    unchanged rest of the catalog are only found by a full rebuild, which
+    happens once more than FULL_REBUILD_SHARE of the catalog changed since
+    the last one.
+    """
+    hashes = [text_hash(text) for text in texts]
+    row_of = {movie_id: row for row, movie_id in enumerate(movie_ids)}
+    previous = previous or {}
+
+    changed = [row for row, movie_id in enumerate(movie_ids)
+               if movie_id not in previous or previous[movie_id][0] != hashes[row]]
+    removed = set(previous) - set(row_of)
+    stale = {movie_ids[row] for row in changed} | removed
+
+    matrix = TfidfMatrix(texts)
+    ids = np.asarray(movie_ids, dtype=np.int64)
+    index = {}
+
+    changed_since_full += len(changed) + len(removed)
+    if not previous or changed_since_full > FULL_REBUILD_SHARE * len(movie_ids):
+        logger.info(f"Full similarity rebuild of {len(movie_ids)} movies")
+        dirty, clean = list(range(len(movie_ids))), []
+        changed_since_full = 0
+    else:
+        dirty, clean = list(changed), []
+        changed_set = set(changed)
+        for row, movie_id in enumerate(movie_ids):
+            if row in changed_set:
+                continue
+            _, neighbours, _ = previous[movie_id]
+            if len(neighbours) == k and any(n in stale for n in neighbours):
+                dirty.append(row)
+            else:
+                clean.append(row)
+        logger.info(f"Incremental similarity rebuild: {len(changed)} new or changed, "
+                    f"{len(removed)} removed, {len(dirty) - len(changed)} unchanged movies rescored, "
+                    f"{changed_since_full} changed since the last full rebuild")
+
+    for row, neighbours, scores in matrix.top_k(dirty, k, chunk_size):
+        index[movie_ids[row]] = (hashes[row], ids[neighbours].tolist(), scores.tolist())
+
+    if clean:
+        # Kept neighbours rescored under the current IDF
+        kept = {row: [row_of[n] for n in previous[movie_ids[row]][1] if n not in stale] for row in clean}
+        left = np.asarray([row for row in clean for _ in kept[row]], dtype=np.int64)
+        right = np.asarray([n for row in clean for n in kept[row]], dtype=np.int64)
+        rescored = iter(matrix.pair_scores(left, right).tolist())
+        candidates = {row: [(movie_ids[n], next(rescored)) for n in kept[row]] for row in clean}
+
+        # Scores of clean movies against the changed ones, column-wise
+        clean_rows = np.asarray(clean, dtype=np.int64)
+        for start in range(0, len(changed), chunk_size):
+            chunk = np.asarray(changed[start:start + chunk_size], dtype=np.int64)
+            scores = matrix.scores(chunk)[:, clean_rows]
+            changed_pos, clean_pos = np.nonzero(scores > 0)
+            for c, u, score in zip(changed_pos, clean_pos, scores[changed_pos, clean_pos]):
+                candidates[clean[u]].append((movie_ids[chunk[c]], float(score)))
+
+        for row in clean:
+            merged = sorted((item for item in candidates[row] if item[1] > 0), key=lambda item: -item[1])[:k]
+            index[movie_ids[row]] = (hashes[row], [n for n, _ in merged], [s for _, s in merged])
+
+    updated = [movie_id for movie_id, entry in index.items()
+               if movie_id not in previous or _stored(previous[movie_id]) != _stored(entry)]
+    return index, updated + sorted(removed), changed_since_full
+
+def _stored(entry):
+    """Neighbours and scores as movie_similarity stores them (NUMERIC(4, 3))"""
+    _, neighbours, scores = entry
+    return list(neighbours), [round(score, 3) for score in scores]
+
+def write_similarity(index, movie_ids, page_size=1000):
+    """Replace the movie_similarity rows of the given movies
+
+    Rows of movies that are no longer in the index are deleted as well.
+    """
+    import db
+    from psycopg2.extras import execute_values
+
+    rows = [
+        (movie_id, rank, neighbour, round(score, 3))
+        for movie_id in movie_ids if movie_id in index
+        for rank, (neighbour, score) in enumerate(zip(index[movie_id][1], index[movie_id][2]), start=1)
+    ]
+    connection = db.connect(dict_rows=False)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(MOVIE_SIMILARITY_DDL)
+            cursor.execute(
+                "DELETE FROM movies_data.movie_similarity WHERE movie_id = ANY(%s) OR NOT movie_id = ANY(%s)",
+                (list(movie_ids), list(index))
+            )
+            execute_values(cursor, """
+                INSERT INTO movies_data.movie_similarity (movie_id, rank, similar_movie_id, score)
+                VALUES %s
+            """, rows, page_size=page_size)
+        connection.commit()
+        logger.info(f"✓ Wrote similar movies for {len(movie_ids)} movies")
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+
+def run(snapshot_dir=snapshot.DEFAULT_SNAPSHOT_DIR, index_path=DEFAULT_INDEX_PATH, k=10, full=False, write=False):
+    """Update the neighbour index from a snapshot; returns the index and the IDs that changed
+
+    With write, every list not yet in movie_similarity is written (all of
+    them the first time), before the index is saved. If the write fails,
+    the next run starts from the old index and writes the same lists again.
+    """
+    previous, written, changed_since_full = None, set(), 0
+    if not full and os.path.exists(index_path):
+        previous, meta, written = load_index(index_path)
+        changed_since_full = meta['changed_since_full']
+        if meta['k'] != k:
+            logger.info(f"k changed from {meta['k']} to {k}, rebuilding everything")
+            previous = None
+
+    movie_ids, texts = movie_texts(snapshot_dir)
+    index, updated, changed_since_full = build_index(movie_ids, texts, previous, k,
+                                                     changed_since_full=changed_since_full)
+    written -= set(updated)
+
+    if write:
+        pending = sorted(set(updated) | (set(index) - written))
+        if pending:
+            write_similarity(index, pending)
+        written = set(index)
+
+    save_index(index, k, index_path, written, changed_since_full)
+    logger.info(f"✓ Similarity index saved to {index_path} ({len(updated)} movies updated)")
+    return index, updated
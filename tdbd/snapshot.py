@@ -0,0 +1,223 @@
+import json
+import os
+import shutil
+import logging
+from datetime import datetime, timezone
+
+import db
+from config import data_path
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = 'movies_data'
+DEFAULT_SNAPSHOT_DIR = data_path('snapshot')
+MANIFEST_FILE = 'manifest.json'
+
+# Column types follow sql_inserts/create_tables.sql. Keys are plain integers
+# and repeated names are dictionary encoded. "user" and guess hold player data
+# and are left out of the snapshot.
+TABLES = {
+    'movie': [
+        ('movie_id', 'int32'),
+        ('title', 'string'),
+        ('release_date', 'date32'),
+        ('duration_minutes', 'int32'),
+        ('rating', 'float32'),
+        ('synopsis', 'string'),
+        ('overview', 'string'),
+        ('adult', 'bool'),
+        ('budget', 'int64'),
+        ('revenue', 'int64'),
+        ('tagline', 'string'),
+        ('producer_id', 'int32'),
+    ],
+    'genre': [('genre_id', 'int32'), ('genre_name', 'dictionary')],
+    'movie_genre': [('movie_id', 'int32'), ('genre_id', 'int32')],
+    'actor': [('actor_id', 'int32'), ('name', 'dictionary'), ('birthdate', 'date32')],
+    'acted_in': [('movie_id', 'int32'), ('actor_id', 'int32')],
+    'director': [
+        ('director_id', 'int32'),
+        ('full_name', 'dictionary'),
+        ('birthdate', 'date32'),
+        ('origin_country', 'dictionary'),
+    ],
+    'movie_director': [('movie_id', 'int32'), ('director_id', 'int32')],
+    'writer': [
+        ('writer_id', 'int32'),
+        ('full_name', 'dictionary'),
+        ('birthdate', 'date32'),
+        ('origin_country', 'dictionary'),
+    ],
+    'movie_writer': [('movie_id', 'int32'), ('writer_id', 'int32')],
+    'producer': [
+        ('producer_id', 'int32'),
+        ('company_name', 'dictionary'),
+        ('foundation_date', 'date32'),
+        ('origin_country', 'dictionary'),
+    ],
+    'award': [('award_id', 'int32'), ('award_name', 'dictionary'), ('description', 'string')],
+    'movie_award': [('movie_id', 'int32'), ('award_id', 'int32'), ('year', 'int32')],
+    'today_movie': [('today_date', 'date32'), ('movie_id', 'int32')],
+}
+
+FORMATS = {'parquet': '.parquet', 'arrow': '.arrow'}
+
+def _arrow_schema(columns):
+    import pyarrow as pa
+
+    types = {
+        'int32': pa.int32(),
+        'int64': pa.int64(),
+        'float32': pa.float32(),
+        'bool': pa.bool_(),
+        'date32': pa.date32(),
+        'string': pa.string(),
+        'dictionary': pa.dictionary(pa.int32(), pa.string()),
+    }
+    return pa.schema([(name, types[kind]) for name, kind in columns])
+
+class _Dictionary:
+    """Dictionary shared by every batch of a column, so later batches only append to it
+
+    Arrow IPC files allow dictionary deltas but not replacements, and a shared
+    dictionary also keeps indices stable across Parquet row groups.
+    """
+    def __init__(self):
+        self.index = {}
+        self.values = []
+
+    def encode(self, values):
+        import pyarrow as pa
+
+        indices = []
+        for value in values:
+            if value is None:
+                indices.append(None)
+                continue
+            i = self.index.get(value)
+            if i is None:
+                i = self.index[value] = len(self.values)
+                self.values.append(value)
+            indices.append(i)
+        return pa.DictionaryArray.from_arrays(
+            pa.array(indices, type=pa.int32()),
+            pa.array(self.values, type=pa.string())
+        )
+
+def _record_batch(rows, columns, schema, dictionaries):
+    """Build an Arrow record batch from a list of row tuples"""
+    import pyarrow as pa
+
+    arrays = []
+    for i, (name, kind) in enumerate(columns):
+        values = [row[i] for row in rows]
+        if kind == 'float32':
+            # NUMERIC columns come back as Decimal
+            values = [None if v is None else float(v) for v in values]
+        if kind == 'dictionary':
+            arrays.append(dictionaries[name].encode(values))
+        else:
+            arrays.append(pa.array(values, type=schema.field(name).type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+def _open_writer(path, schema, file_format, columns):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if file_format == 'parquet':
+        dictionary_columns = [name for name, kind in columns if kind == 'dictionary']
+        return pq.ParquetWriter(path, schema, use_dictionary=dictionary_columns or False, compression='zstd')
+    return pa.ipc.new_file(path, schema, options=pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True))
+
+def export_table(connection, table, out_dir, file_format='parquet', row_group_size=50000):
+    """Stream one table into a snapshot file, one row group per fetch"""
+    columns = TABLES[table]
+    schema = _arrow_schema(columns)
+    path = os.path.join(out_dir, table + FORMATS[file_format])
+    column_list = ', '.join(name for name, _ in columns)
+    dictionaries = {name: _Dictionary() for name, kind in columns if kind == 'dictionary'}
+
+    rows_written = 0
+    # Named cursor: rows are streamed from the server instead of loaded at once
+    with connection.cursor(name=f"snapshot_{table}") as cursor:
+        cursor.itersize = row_group_size
+        cursor.execute(f'SELECT {column_list} FROM {SCHEMA}."{table}" ORDER BY 1')
+
+        writer = _open_writer(path, schema, file_format, columns)
+        try:
+            while True:
+                rows = cursor.fetchmany(row_group_size)
+                if not rows:
+                    break
+                batch = _record_batch(rows, columns, schema, dictionaries)
+                if file_format == 'parquet':
+                    writer.write_batch(batch, row_group_size=row_group_size)
+                else:
+                    writer.write_batch(batch)
+                rows_written += len(rows)
+        finally:
+            writer.close()
+
+    logger.info(f"✓ Exported {rows_written} rows from {table}")
+    return rows_written
+
+def export_snapshot(out_dir=DEFAULT_SNAPSHOT_DIR, file_format='parquet', row_group_size=50000, tables=None):
+    """Export a consistent snapshot of the movie tables to Parquet or Arrow files
+
+    All tables are read inside one REPEATABLE READ transaction, so they reflect
+    the same moment even while ingestion is running. Files are written to a
+    temporary directory that replaces out_dir only once everything succeeded.
+    """
+    tables = tables or list(TABLES)
+    tmp_dir = f"{out_dir}.tmp-{os.getpid()}"
+    os.makedirs(tmp_dir, exist_ok=True)
+
+    connection = db.connect(dict_rows=False)
+    try:
+        connection.set_session(isolation_level='REPEATABLE READ', readonly=True)
+        row_counts = {table: export_table(connection, table, tmp_dir, file_format, row_group_size)
+                      for table in tables}
+        connection.rollback()
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    finally:
+        connection.close()
+
+    manifest = {
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'format': file_format,
+        'row_counts': row_counts,
+        'columns': {table: dict(TABLES[table]) for table in tables},
+    }
+    with open(os.path.join(tmp_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+    if os.path.exists(out_dir):
+        shutil.rmtree(out_dir)
+    os.rename(tmp_dir, out_dir)
+
+    logger.info(f"✓ Snapshot of {len(tables)} tables written to {out_dir}")
+    return manifest
+
+def read_manifest(snapshot_dir=DEFAULT_SNAPSHOT_DIR):
+    with open(os.path.join(snapshot_dir, MANIFEST_FILE), encoding='utf-8') as f:
+        return json.load(f)
+
+def load_table(table, snapshot_dir=DEFAULT_SNAPSHOT_DIR, file_format=None):
+    """Load one snapshot table as a pyarrow Table, memory-mapping the file"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    file_format = file_format or read_manifest(snapshot_dir)['format']
+    path = os.path.join(snapshot_dir, table + FORMATS[file_format])
+    if file_format == 'parquet':
+        return pq.read_table(path, memory_map=True)
+    # Arrow IPC buffers point straight into the mapped file (no copy)
+    return pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+
+def load_snapshot(snapshot_dir=DEFAULT_SNAPSHOT_DIR, tables=None):
+    """Load snapshot tables into a dict of table name -> pyarrow Table"""
+    manifest = read_manifest(snapshot_dir)
+    tables = tables or list(manifest['row_counts'])
+    return {table: load_table(table, snapshot_dir, manifest['format']) for table in tables}
@@ -137,4 +137,26 @@ CREATE TABLE movie_genre (
     PRIMARY KEY (movie_id, genre_id),
     CONSTRAINT fk_movie_id FOREIGN KEY (movie_id) REFERENCES movie(movie_id) ON DELETE CASCADE,
     CONSTRAINT fk_genre_id FOREIGN KEY (genre_id) REFERENCES genre(genre_id) ON DELETE CASCADE
-);
\ No newline at end of file
+);
+
+DROP TABLE IF EXISTS movie_stats;
+CREATE TABLE movie_stats (
+    movie_id INT PRIMARY KEY,
+    degree INT NOT NULL,
+    neighbor_movies INT NOT NULL,
+    component_size INT NOT NULL,
+    difficulty NUMERIC(4, 3) NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    CONSTRAINT fk_movie_id FOREIGN KEY (movie_id) REFERENCES movie(movie_id) ON DELETE CASCADE
+);
+
+DROP TABLE IF EXISTS movie_similarity;
+CREATE TABLE movie_similarity (
+    movie_id INT NOT NULL,
+    rank SMALLINT NOT NULL,
+    similar_movie_id INT NOT NULL,
+    score NUMERIC(4, 3) NOT NULL,
+    PRIMARY KEY (movie_id, rank),
+    CONSTRAINT fk_movie_id FOREIGN KEY (movie_id) REFERENCES movie(movie_id) ON DELETE CASCADE,
+    CONSTRAINT fk_similar_movie_id FOREIGN KEY (similar_movie_id) REFERENCES movie(movie_id) ON DELETE CASCADE
+);
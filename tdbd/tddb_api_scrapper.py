@@ -1,36 +1,30 @@
-import requests
-import json
-import os
-import psycopg2
-from psycopg2.extras import RealDictCursor
-from dotenv import load_dotenv
+import importlib
+from itertools import groupby
+from config import setup, get_env
+import db
+import tmdb
+from pipeline import Pipeline, Stage
+from registry import MovieRegistry
+from validation import RowValidator
 import logging
 
-# Load environment variables
-load_dotenv()
-
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+MOVIE_COLUMNS = ('movie_id', 'title', 'release_date', 'duration_minutes', 'rating', 'synopsis',
+                 'overview', 'adult', 'budget', 'revenue', 'tagline')
+
 class TMDBScrapper:
-    def __init__(self):
-        self.tmdb_token = os.getenv('TMDB_BEARER_TOKEN')
-        self.db_url = os.getenv('DATABASE_URL')
+    def __init__(self, registry=None):
+        self.tmdb_token = get_env('TMDB_BEARER_TOKEN')
+        self.db_url = get_env('DATABASE_URL')
         self.connection = None
-        
-        if not self.tmdb_token:
-            raise ValueError("TMDB_BEARER_TOKEN not found in environment variables")
-        if not self.db_url:
-            raise ValueError("DATABASE_URL not found in environment variables")
+        self.registry = registry
+        self.validator = RowValidator()
     
     def connect_db(self):
         """Connect to Neon PostgreSQL database"""
         try:
-            self.connection = psycopg2.connect(
-                self.db_url,
-                cursor_factory=RealDictCursor
-            )
+            self.connection = db.connect(self.db_url)
             logger.info("✓ Connected to Neon PostgreSQL database")
             return True
         except Exception as e:
@@ -85,7 +79,7 @@ class TMDBScrapper:
         }
         
         try:
-            response = requests.get(url, headers=headers)
+            response = tmdb.get(url, headers)
             if response.status_code == 200:
                 return response.json()
             else:
@@ -104,7 +98,7 @@ class TMDBScrapper:
         }
         
         try:
-            response = requests.get(url, headers=headers)
+            response = tmdb.get(url, headers)
             if response.status_code == 200:
                 return response.json()
             else:
@@ -155,30 +149,33 @@ class TMDBScrapper:
             movie_data.get('tagline', '')
         )
         
-        queries.append({'query': movie_query, 'params': movie_params})
+        movie_entity = ('movie', movie_data['id'])
+        queries.append({'query': movie_query, 'params': movie_params, 'entity': movie_entity, 'table': 'movie', 'columns': MOVIE_COLUMNS})
         
         # Genres
         if movie_data.get('genres'):
             for genre in movie_data['genres']:
                 # Insert genre
                 genre_query = "INSERT INTO genre (genre_id, genre_name) VALUES (%s, %s) ON CONFLICT (genre_id) DO NOTHING"
-                queries.append({'query': genre_query, 'params': (genre['id'], genre['name'])})
+                entity = ('genre', genre['id'])
+                queries.append({'query': genre_query, 'params': (genre['id'], genre['name']), 'entity': entity, 'table': 'genre', 'columns': ('genre_id', 'genre_name')})
                 
                 # Insert movie-genre relationship
                 movie_genre_query = "INSERT INTO movie_genre (movie_id, genre_id) VALUES (%s, %s) ON CONFLICT DO NOTHING"
-                queries.append({'query': movie_genre_query, 'params': (movie_data['id'], genre['id'])})
+                queries.append({'query': movie_genre_query, 'params': (movie_data['id'], genre['id']), 'entity': entity})
         
         # Production Companies as Producers
         if movie_data.get('production_companies'):
             for i, company in enumerate(movie_data['production_companies']):
                 # Insert producer
                 producer_query = "INSERT INTO producer (producer_id, company_name, origin_country) VALUES (%s, %s, %s) ON CONFLICT (producer_id) DO NOTHING"
-                queries.append({'query': producer_query, 'params': (company['id'], company['name'], company.get('origin_country', ''))})
+                entity = ('producer', company['id'])
+                queries.append({'query': producer_query, 'params': (company['id'], company['name'], company.get('origin_country', '')), 'entity': entity, 'table': 'producer', 'columns': ('producer_id', 'company_name', 'origin_country')})
                 
                 # Update movie with first producer
                 if i == 0:
                     update_movie_query = "UPDATE movie SET producer_id = %s WHERE movie_id = %s"
-                    queries.append({'query': update_movie_query, 'params': (company['id'], movie_data['id'])})
+                    queries.append({'query': update_movie_query, 'params': (company['id'], movie_data['id']), 'entity': entity})
         
         return queries
     
@@ -191,11 +188,12 @@ class TMDBScrapper:
             for actor in credits_data['cast'][:10]:  # Limit to top 10 actors
                 # Insert actor
                 actor_query = "INSERT INTO actor (actor_id, name) VALUES (%s, %s) ON CONFLICT (actor_id) DO NOTHING"
-                queries.append({'query': actor_query, 'params': (actor['id'], actor['name'])})
+                entity = ('actor', actor['id'])
+                queries.append({'query': actor_query, 'params': (actor['id'], actor['name']), 'entity': entity, 'table': 'actor', 'columns': ('actor_id', 'name')})
                 
                 # Insert movie-actor relationship
                 acted_in_query = "INSERT INTO acted_in (movie_id, actor_id) VALUES (%s, %s) ON CONFLICT DO NOTHING"
-                queries.append({'query': acted_in_query, 'params': (movie_id, actor['id'])})
+                queries.append({'query': acted_in_query, 'params': (movie_id, actor['id']), 'entity': entity})
         
         # Directors and Writers
         if credits_data.get('crew'):
@@ -203,122 +201,213 @@ class TMDBScrapper:
                 if crew_member['job'] == 'Director':
                     # Insert director
                     director_query = "INSERT INTO director (director_id, full_name) VALUES (%s, %s) ON CONFLICT (director_id) DO NOTHING"
-                    queries.append({'query': director_query, 'params': (crew_member['id'], crew_member['name'])})
+                    entity = ('director', crew_member['id'])
+                    queries.append({'query': director_query, 'params': (crew_member['id'], crew_member['name']), 'entity': entity, 'table': 'director', 'columns': ('director_id', 'full_name')})
                     
                     # Insert movie-director relationship
                     movie_director_query = "INSERT INTO movie_director (movie_id, director_id) VALUES (%s, %s) ON CONFLICT DO NOTHING"
-                    queries.append({'query': movie_director_query, 'params': (movie_id, crew_member['id'])})
+                    queries.append({'query': movie_director_query, 'params': (movie_id, crew_member['id']), 'entity': entity})
                 
                 elif crew_member['job'] in ['Writer', 'Screenplay', 'Story']:
                     # Insert writer
                     writer_query = "INSERT INTO writer (writer_id, full_name) VALUES (%s, %s) ON CONFLICT (writer_id) DO NOTHING"
-                    queries.append({'query': writer_query, 'params': (crew_member['id'], crew_member['name'])})
+                    entity = ('writer', crew_member['id'])
+                    queries.append({'query': writer_query, 'params': (crew_member['id'], crew_member['name']), 'entity': entity, 'table': 'writer', 'columns': ('writer_id', 'full_name')})
                     
                     # Insert movie-writer relationship
                     movie_writer_query = "INSERT INTO movie_writer (movie_id, writer_id) VALUES (%s, %s) ON CONFLICT DO NOTHING"
-                    queries.append({'query': movie_writer_query, 'params': (movie_id, crew_member['id'])})
+                    queries.append({'query': movie_writer_query, 'params': (movie_id, crew_member['id']), 'entity': entity})
         
         return queries
     
-    def process_movie(self, movie_id):
-        """Process a single movie and insert into database"""
+    def fetch_movie(self, movie_id):
+        """Fetch movie details and credits from TMDB"""
         logger.info(f"Processing movie ID: {movie_id}")
         
-        # Fetch data from TMDB
         movie_data = self.get_movie_by_id(movie_id)
-        credits_data = self.get_movie_credits(movie_id)
-        
         if not movie_data:
             logger.error(f"Failed to fetch movie data for ID {movie_id}")
-            return False
-        
-        # Prepare queries
-        all_queries = []
+            return None
         
-        # Movie data queries
-        movie_queries = self.insert_movie_data(movie_data)
-        all_queries.extend(movie_queries)
+        credits_data = self.get_movie_credits(movie_id)
+        return movie_id, movie_data, credits_data
+    
+    def build_movie_queries(self, fetched):
+        """Turn fetched movie and credits data into the movie's queries"""
+        movie_id, movie_data, credits_data = fetched
         
-        # Credits data queries
+        queries = self.insert_movie_data(movie_data)
         if credits_data:
-            credits_queries = self.insert_credits_data(movie_id, credits_data)
-            all_queries.extend(credits_queries)
+            queries.extend(self.insert_credits_data(movie_id, credits_data))
         
-        # Execute all queries
-        if self.execute_batch_queries(all_queries):
-            logger.info(f"✓ Movie {movie_id} ({movie_data['title']}) processed successfully")
-            return True
-        else:
-            logger.error(f"✗ Failed to process movie {movie_id}")
+        return movie_id, movie_data['title'], queries
+    
+    def validate_movie(self, movie):
+        """Normalize a movie's queries against create_tables.sql before they reach the database"""
+        movie_id, title, queries = movie
+        validated = self.validator.validate(movie_id, queries)
+        
+        if not any(query_info.get('entity') == ('movie', movie_id) for query_info in validated):
+            logger.error(f"✗ Movie {movie_id} quarantined: movie row failed validation")
+            return None
+        return movie_id, title, validated
+    
+    def execute_movie(self, cursor, movie):
+        """Execute one movie's queries with a savepoint per entity
+        
+        A failing genre, producer or person is rolled back on its own and
+        quarantined; only a failure of the movie row itself drops the movie.
+        """
+        movie_id, _, queries = movie
+        cursor.execute("SAVEPOINT movie_write")
+        
+        for entity, group in groupby(queries, key=lambda query_info: query_info.get('entity')):
+            cursor.execute("SAVEPOINT entity_write")
+            try:
+                for query_info in group:
+                    cursor.execute(query_info['query'], query_info.get('params'))
+            except Exception as e:
+                cursor.execute("ROLLBACK TO SAVEPOINT entity_write")
+                if entity == ('movie', movie_id):
+                    cursor.execute("ROLLBACK TO SAVEPOINT movie_write")
+                    self.validator.quarantine.add(movie_id, 'movie', str(e).strip(), entity=entity)
+                    return False
+                self.validator.quarantine.add(movie_id, entity[0] if entity else None, str(e).strip(), entity=entity)
+            cursor.execute("RELEASE SAVEPOINT entity_write")
+        
+        cursor.execute("RELEASE SAVEPOINT movie_write")
+        return True
+    
+    def write_movies(self, movies):
+        """Write a batch of movies in one transaction, isolating failures with savepoints"""
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute("SET search_path TO movies_data;")
+                written = [movie for movie in movies if self.execute_movie(cursor, movie)]
+                self.connection.commit()
+        except Exception as e:
+            logger.error(f"Batch write failed: {e}")
+            self.connection.rollback()
+            written = []
+        
+        written_ids = {movie_id for movie_id, _, _ in written}
+        if self.registry and written_ids:
+            self.registry.mark_ingested(written_ids)
+        
+        for movie_id, title, _ in movies:
+            if movie_id in written_ids:
+                logger.info(f"✓ Movie {movie_id} ({title}) processed successfully")
+            else:
+                logger.error(f"✗ Failed to process movie {movie_id}")
+        
+        return written
+    
+    def process_movie(self, movie_id):
+        """Process a single movie and insert into database"""
+        fetched = self.fetch_movie(movie_id)
+        if not fetched:
+            return False
+        
+        movie = self.validate_movie(self.build_movie_queries(fetched))
+        if not movie:
             return False
+        
+        return len(self.write_movies([movie])) == 1
     
-    def process_multiple_movies(self, movie_ids):
-        """Process multiple movies"""
+    def skip_ingested(self, movie_ids):
+        """Yield only the movie IDs the registry has not seen ingested"""
+        skipped = 0
+        for movie_id in movie_ids:
+            if self.registry and self.registry.is_ingested(movie_id):
+                skipped += 1
+                continue
+            yield movie_id
+        if skipped:
+            logger.info(f"Skipped {skipped} movies already in the database")
+    
+    def process_multiple_movies(self, movie_ids, fetch_workers=4, batch_size=10, queue_size=16, refresh=False):
+        """Process multiple movies through a fetch -> transform -> validate -> write pipeline
+        
+        movie_ids can be any iterable (including a generator); it is consumed
+        lazily and at most queue_size movies wait between two stages, so the
+        slowest stage sets the pace and memory use stays constant. Movies the
+        registry knows are ingested are skipped unless refresh is set.
+        """
         if not self.connect_db():
             return False
         
-        successful = 0
-        failed = 0
+        if not refresh:
+            movie_ids = self.skip_ingested(movie_ids)
         
-        try:
-            for movie_id in movie_ids:
-                if self.process_movie(movie_id):
-                    successful += 1
-                else:
-                    failed += 1
-                
-                logger.info(f"Progress: {successful + failed}/{len(movie_ids)} movies processed")
+        fetch = Stage('fetch', self.fetch_movie, workers=fetch_workers)
+        transform = Stage('transform', self.build_movie_queries)
+        validate = Stage('validate', self.validate_movie)
+        write = Stage('write', self.write_movies, batch_size=batch_size)
         
+        try:
+            Pipeline([fetch, transform, validate, write], queue_size=queue_size).run(movie_ids)
         finally:
             self.close_db()
         
+        successful = write.processed
+        failed = fetch.dropped + transform.dropped + validate.dropped + write.dropped
+        
         logger.info(f"Processing complete: {successful} successful, {failed} failed")
-        return successful > 0
+        return successful > 0 or failed == 0
+    
+    def sync_registry(self):
+        """Mark every movie already in the movie table as ingested in the registry"""
+        if not self.connect_db():
+            return False
+        
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute("SELECT movie_id FROM movies_data.movie")
+                movie_ids = [row['movie_id'] for row in cursor]
+        finally:
+            self.close_db()
+        
+        self.registry.mark_ingested(movie_ids, collector='database')
+        logger.info(f"✓ Registry synced with {len(movie_ids)} movies from the database")
+        return True
+
+# Modules generated by the collectors (save_ids_for_scrapper)
+ID_SOURCES = {
+    'brazilian': 'brazilian_movies_for_scrapper',
+    'popular': 'movie_ids_for_scrapper',
+}
+
+FALLBACK_MOVIE_IDS = [11, 550, 13, 120, 680, 155, 598, 24428, 27205, 475557]
 
-def main():
+def load_movie_ids(source='brazilian'):
+    """Load the movie IDs generated by a collector"""
+    module = importlib.import_module(ID_SOURCES[source])
+    return module.MOVIE_IDS
+
+def main(source='brazilian', fetch_workers=4, batch_size=10, refresh=False):
     """Main execution function"""
     # Initialize scrapper
-    scrapper = TMDBScrapper()
+    scrapper = TMDBScrapper(registry=MovieRegistry())
     
     # Import movie IDs from the collector
     try:
-        from brazilian_movies_for_scrapper import MOVIE_IDS, MOVIE_BATCHES
-        logger.info(f"Loaded {len(MOVIE_IDS)} movie IDs from collector")
-        
-        # Process all movies in batches
-        total_successful = 0
-        total_failed = 0
-        
-        for batch_num, batch_ids in enumerate(MOVIE_BATCHES, 1):
-            logger.info(f"Processing batch {batch_num}/{len(MOVIE_BATCHES)} ({len(batch_ids)} movies)")
-            
-            success = scrapper.process_multiple_movies(batch_ids)
-            
-            if success:
-                total_successful += len(batch_ids)
-                logger.info(f"✓ Batch {batch_num} completed successfully")
-            else:
-                total_failed += len(batch_ids)
-                logger.error(f"✗ Batch {batch_num} failed")
-            
-            # Small delay between batches to respect API limits
-            import time
-            time.sleep(1)
-        
-        logger.info(f"Final results: {total_successful} successful, {total_failed} failed")
-        
+        movie_ids = load_movie_ids(source)
+        logger.info(f"Loaded {len(movie_ids)} movie IDs from collector")
     except ImportError:
         # Fallback to original smaller list
-        logger.warning("movie_ids_for_scrapper.py not found, using fallback movie IDs")
-        movie_ids = [11, 550, 13, 120, 680, 155, 598, 24428, 27205, 475557]
-        
-        logger.info(f"Starting to process {len(movie_ids)} movies")
-        success = scrapper.process_multiple_movies(movie_ids)
-        
-        if success:
-            logger.info("✓ Processing completed successfully")
-        else:
-            logger.error("✗ Processing failed")
+        logger.warning(f"{ID_SOURCES[source]}.py not found, using fallback movie IDs")
+        movie_ids = FALLBACK_MOVIE_IDS
+    
+    logger.info(f"Starting to process {len(movie_ids)} movies")
+    success = scrapper.process_multiple_movies(
+        movie_ids, fetch_workers=fetch_workers, batch_size=batch_size, refresh=refresh
+    )
+    
+    if success:
+        logger.info("✓ Processing completed successfully")
+    else:
+        logger.error("✗ Processing failed")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    setup()
+    main()
@@ -0,0 +1,43 @@
+import random
+import time
+import logging
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Throttling and transient server errors; anything else is returned to the caller
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+def _retry_after(response):
+    """Seconds requested by a Retry-After header, if it holds a number"""
+    try:
+        return float(response.headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+def get(url, headers, params=None, retries=4, backoff=1.0, max_wait=30, timeout=30):
+    """GET a TMDB URL, retrying 429 and 5xx responses and connection errors
+
+    Waits as long as Retry-After asks when TMDB sends it, otherwise backs
+    off exponentially with jitter, so concurrent workers slow down together
+    instead of dropping movies. Returns the last response; a connection
+    error on the last attempt is raised like requests.get would.
+    """
+    for attempt in range(retries + 1):
+        wait = backoff * 2 ** attempt * (0.5 + random.random())
+        try:
+            response = requests.get(url, headers=headers, params=params, timeout=timeout)
+        except requests.RequestException as e:
+            if attempt == retries:
+                raise
+            reason = str(e)
+        else:
+            if response.status_code not in RETRY_STATUSES or attempt == retries:
+                return response
+            wait = _retry_after(response) or wait
+            reason = f"HTTP {response.status_code}"
+
+        wait = min(wait, max_wait)
+        logger.warning(f"TMDB request {url} failed ({reason}), retrying in {wait:.1f}s")
+        time.sleep(wait)
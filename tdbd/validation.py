@@ -0,0 +1,212 @@
+import json
+import os
+import re
+import threading
+import logging
+from datetime import date, datetime, timezone
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+from config import data_path
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sql_inserts', 'create_tables.sql')
+DEFAULT_QUARANTINE_PATH = data_path('quarantine.jsonl')
+
+INT_RANGE = (-2**31, 2**31 - 1)
+BIGINT_RANGE = (-2**63, 2**63 - 1)
+
+_TABLE_RE = re.compile(r'CREATE TABLE\s+"?(\w+)"?\s*\((.*?)\n\);', re.S | re.I)
+_COLUMN_RE = re.compile(
+    r'^\s*(\w+)\s+(SERIAL|INT|BIGINT|TEXT|DATE|BOOLEAN|VARCHAR\((\d+)\)|NUMERIC\((\d+),\s*(\d+)\)|TIMESTAMP[\w ]*)(.*)$',
+    re.I
+)
+
+class ColumnSpec:
+    def __init__(self, name, kind, length=None, precision=None, scale=None, not_null=False):
+        self.name = name
+        self.kind = kind
+        self.length = length
+        self.precision = precision
+        self.scale = scale
+        self.not_null = not_null
+
+def load_schema(path=SCHEMA_FILE):
+    """Parse column types and NOT NULL constraints from create_tables.sql"""
+    with open(path, encoding='utf-8') as f:
+        sql = f.read()
+
+    schema = {}
+    for table, body in _TABLE_RE.findall(sql):
+        columns = {}
+        for line in body.splitlines():
+            match = _COLUMN_RE.match(line)
+            if not match or match.group(1).upper() in ('CONSTRAINT', 'PRIMARY', 'UNIQUE'):
+                continue
+            name, kind, length, precision, scale, rest = match.groups()
+            kind = kind.split('(')[0].split()[0].lower()
+            columns[name] = ColumnSpec(
+                name,
+                kind,
+                length=int(length) if length else None,
+                precision=int(precision) if precision else None,
+                scale=int(scale) if scale else None,
+                not_null=kind == 'serial' or 'NOT NULL' in rest.upper() or 'PRIMARY KEY' in rest.upper(),
+            )
+        schema[table] = columns
+    return schema
+
+def _coerce_integer(values, spec, low, high):
+    out, issues = [], []
+    for i, value in enumerate(values):
+        try:
+            number = None if value in (None, '') else int(value)
+        except (TypeError, ValueError):
+            number = None
+            issues.append((i, value, 'not an integer'))
+        else:
+            if number is not None and not low <= number <= high:
+                issues.append((i, value, 'out of range'))
+                number = None
+        out.append(number)
+    return out, issues
+
+def _coerce_varchar(values, spec):
+    out, issues = [], []
+    for i, value in enumerate(values):
+        if value is not None:
+            value = str(value)
+            if len(value) > spec.length:
+                issues.append((i, value, f"truncated to {spec.length} characters"))
+                value = value[:spec.length]
+        out.append(value)
+    return out, issues
+
+def _coerce_text(values, spec):
+    return [None if value is None else str(value) for value in values], []
+
+def _coerce_date(values, spec):
+    out, issues = [], []
+    for i, value in enumerate(values):
+        if value in (None, ''):
+            out.append(None)
+            continue
+        if isinstance(value, date):
+            out.append(value)
+            continue
+        try:
+            out.append(date.fromisoformat(str(value)))
+        except ValueError:
+            issues.append((i, value, 'invalid date'))
+            out.append(None)
+    return out, issues
+
+def _coerce_numeric(values, spec):
+    limit = Decimal(10) ** (spec.precision - spec.scale)
+    quantum = Decimal(1).scaleb(-spec.scale)
+    out, issues = [], []
+    for i, value in enumerate(values):
+        if value in (None, ''):
+            out.append(None)
+            continue
+        try:
+            number = Decimal(str(value)).quantize(quantum, rounding=ROUND_HALF_UP)
+        except InvalidOperation:
+            issues.append((i, value, 'not a number'))
+            out.append(None)
+            continue
+        if abs(number) >= limit:
+            issues.append((i, value, f"does not fit NUMERIC({spec.precision}, {spec.scale})"))
+            number = None
+        out.append(number)
+    return out, issues
+
+def _coerce_boolean(values, spec):
+    return [None if value is None else bool(value) for value in values], []
+
+COERCERS = {
+    'serial': lambda values, spec: _coerce_integer(values, spec, *INT_RANGE),
+    'int': lambda values, spec: _coerce_integer(values, spec, *INT_RANGE),
+    'bigint': lambda values, spec: _coerce_integer(values, spec, *BIGINT_RANGE),
+    'varchar': _coerce_varchar,
+    'text': _coerce_text,
+    'date': _coerce_date,
+    'numeric': _coerce_numeric,
+    'boolean': _coerce_boolean,
+}
+
+class Quarantine:
+    """Append-only JSON lines file of values and entities that could not be stored as-is"""
+    def __init__(self, path=None):
+        self.path = path or os.getenv('QUARANTINE_PATH', DEFAULT_QUARANTINE_PATH)
+        self._lock = threading.Lock()
+
+    def add(self, movie_id, table, reason, column=None, value=None, action='dropped', entity=None):
+        """Record an issue; entity is the (type, id) pair of the row, e.g. ('actor', 287)"""
+        entity_type, entity_id = entity or (None, None)
+        record = {
+            'time': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'movie_id': movie_id,
+            'entity_type': entity_type,
+            'entity_id': entity_id,
+            'table': table,
+            'column': column,
+            'value': value,
+            'reason': reason,
+            'action': action,
+        }
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+        entity_note = f" ({entity_type} {entity_id})" if entity else ''
+        logger.warning(f"Quarantined {table}.{column or '*'}{entity_note} for movie {movie_id}: {reason} ({action})")
+
+class RowValidator:
+    """Validate and normalize a movie's insert queries against the table schema.
+
+    Queries tagged with 'table' and 'columns' are grouped per table and checked
+    one column at a time across all rows. Invalid values are coerced (empty
+    dates become NULL, long strings are truncated, out-of-range numbers become
+    NULL). A row that still breaks a NOT NULL column is quarantined together
+    with the rest of its entity (e.g. an actor and its acted_in link).
+    """
+    def __init__(self, schema=None, quarantine=None):
+        self.schema = schema or load_schema()
+        self.quarantine = quarantine or Quarantine()
+
+    def validate(self, movie_id, queries):
+        """Return the queries with coerced params, minus quarantined entities"""
+        by_table = {}
+        for i, query_info in enumerate(queries):
+            if query_info.get('table') in self.schema:
+                by_table.setdefault(query_info['table'], []).append(i)
+
+        params = [list(query_info.get('params') or ()) for query_info in queries]
+        rejected_entities = set()
+
+        for table, indexes in by_table.items():
+            columns = queries[indexes[0]]['columns']
+            for position, column in enumerate(columns):
+                spec = self.schema[table].get(column)
+                if spec is None:
+                    continue
+
+                values = [params[i][position] for i in indexes]
+                coerced, issues = COERCERS[spec.kind](values, spec)
+                for row, value, reason in issues:
+                    self.quarantine.add(movie_id, table, reason, column, value, action='coerced',
+                                        entity=queries[indexes[row]].get('entity'))
+
+                for i, value in zip(indexes, coerced):
+                    params[i][position] = value
+                    if value is None and spec.not_null:
+                        rejected_entities.add(queries[i].get('entity'))
+                        self.quarantine.add(movie_id, table, 'NULL in NOT NULL column', column,
+                                            entity=queries[i].get('entity'))
+
+        validated = []
+        for query_info, query_params in zip(queries, params):
+            if query_info.get('entity') in rejected_entities:
+                continue
+            validated.append(dict(query_info, params=tuple(query_params)))
+        return validated